@@ -0,0 +1,78 @@
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import registry
+
+# Libraries that must only be imported when a combination needs them
+lazy_modules = ['xgboost', 'imblearn', 'category_encoders', 'mlxtend', 'matplotlib', 'sklearn.ensemble']
+
+measure_script = """
+import json, sys, time
+start = time.perf_counter()
+import main
+main_time = time.perf_counter() - start
+import registry
+start = time.perf_counter()
+if {kind!r}:
+    registry.load({kind!r}, {name!r})
+option_time = time.perf_counter() - start
+print(json.dumps({{'main': main_time, 'option': option_time, 'modules': sorted(sys.modules)}}))
+"""
+
+
+def measure(kind=None, name=None):
+    """
+    Imports main, and optionally the class of an option, in a fresh interpreter.
+
+    Args:
+        kind (string): type of option of the registry, None only measures main.
+        name (string): value of the option.
+
+    Returns:
+        A dictionary with the import time of main, the extra time of the option and the imported modules.
+    """
+    root = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+    output = subprocess.run([sys.executable, '-c', measure_script.format(kind=kind, name=name)], cwd=root,
+                            capture_output=True, text=True, check=True).stdout
+
+    return json.loads(output.strip().splitlines()[-1])
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Measures the import time of the pipeline and of every option.")
+    parser.add_argument('--repeats', type=int, default=5, help="Number of fresh interpreters per measure (default: 5).")
+    parser.add_argument('--max-seconds', type=float, default=None,
+                        help="Fails if importing main takes longer than this number of seconds.")
+    arguments = parser.parse_args()
+
+    failed = False
+
+    runs = [measure() for _ in range(arguments.repeats)]
+    main_time = statistics.median(run['main'] for run in runs)
+    print(f"{'import main':<45}{main_time:>8.3f} s")
+
+    eager_modules = [module for module in lazy_modules if module in runs[0]['modules']]
+    if eager_modules:
+        print("Modules imported eagerly by main: " + ", ".join(eager_modules))
+        failed = True
+
+    if arguments.max_seconds is not None and main_time > arguments.max_seconds:
+        print(f"Importing main took longer than {arguments.max_seconds} s")
+        failed = True
+
+    for kind, options in registry.registry.items():
+        for name in options:
+            option_time = statistics.median(measure(kind, name)['option'] for _ in range(arguments.repeats))
+            print(f"{'  + ' + kind + ' ' + name:<45}{option_time:>8.3f} s")
+
+    sys.exit(1 if failed else 0)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,215 @@
+import argparse
+import copy
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import registry
+from benchmarks.synthetic_data import generate_dataset
+from model.Plotter import Plotter
+from model.evaluation.BootstrapPoint632 import BootstrapPoint632
+from model.evaluation.TrainTest import TrainTest
+from preprocessing.PreprocessingPipeline import PreprocessingPipeline
+
+models = ['logistic_regression', 'random_forest', 'xgboost', 'rbf_svm', 'gradient_descent']
+
+base_parameters = {
+    'target': 'target',
+    'features': [],
+    'imputer': 'simple_imputer',
+    'scaler': 'z_score',
+    'encoder': 'one_hot',
+    'class_balancer': '',
+    'feature_selector': '',
+    'num_features': 0,
+    'evaluation_technique': 'train_test',
+    'enable_parameter_search': False,
+    'parameters_grid': '',
+    'plot_mean_roc': True,
+    'roc_color': 'red',
+    'test_size': 0.3,
+    'seed': 1234,
+}
+
+
+def measure(function, repeats, trace_memory):
+    """
+    Times a function, keeping the best of several runs, and measures its peak memory in an extra traced run so
+    tracing does not slow down the timed ones.
+
+    Args:
+        function (callable): function to be measured, it is called without arguments.
+        repeats (int): number of timed runs.
+        trace_memory (bool): whether the peak memory is measured.
+
+    Returns:
+        A tuple with a dictionary containing the wall time in seconds and the peak memory in MB, and the value
+        returned by the last run.
+    """
+    times = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        result = function()
+        times.append(time.perf_counter() - start)
+
+    measures = {'seconds': min(times)}
+
+    if trace_memory:
+        tracemalloc.start()
+        result = function()
+        measures['peak_memory_mb'] = tracemalloc.get_traced_memory()[1] / 1024 ** 2
+        tracemalloc.stop()
+
+    return measures, result
+
+
+def benchmark_dataset(dataframe, arguments, output_path):
+    """
+    Runs every stage of the pipeline over a dataset.
+
+    Args:
+        dataframe (dataframe): synthetic dataset.
+        arguments (namespace): command-line arguments.
+        output_path (string): folder where the evaluation plots are written.
+
+    Returns:
+        A dictionary with the measures of every stage.
+    """
+    results = {}
+    parameters = dict(base_parameters, splitting_runs=arguments.splitting_runs, bootstrap_runs=arguments.bootstrap_runs,
+                      output_path=output_path)
+
+    measures, preprocessed = measure(lambda: PreprocessingPipeline(dataframe, dict(parameters)).run(),
+                                     arguments.repeats, not arguments.no_memory)
+    results['preprocessing'] = measures
+
+    for model_name in arguments.models:
+        model_parameters = dict(preprocessed, model=model_name, parameters_grid='')
+
+        def train():
+            model = registry.load('model', model_name)(dict(model_parameters))
+            return model.train()
+
+        try:
+            measures, model = measure(train, arguments.repeats, not arguments.no_memory)
+        except Exception as e:
+            # A model that can not be trained with the installed libraries does not stop the rest of the benchmark
+            print(f"Skipping {model_name}, training failed: {str(e).strip().splitlines()[0]}")
+            continue
+        results[f"train/{model_name}"] = measures
+
+        model_parameters['best_params'] = model.best_params_
+
+        def train_test():
+            results = TrainTest(copy.copy(model_parameters), model).evaluate()
+            # The ROC plot is rendered in the background, its time belongs to this stage
+            Plotter.wait()
+            return results
+
+        measures, _ = measure(train_test, arguments.repeats, not arguments.no_memory)
+        results[f"train_test/{model_name}"] = measures
+
+        measures, _ = measure(lambda: BootstrapPoint632(copy.copy(model_parameters)).evaluate(),
+                              arguments.repeats, not arguments.no_memory)
+        results[f"bootstrap_point632/{model_name}"] = measures
+
+    return results
+
+
+def compare(results, baseline, tolerance, min_seconds):
+    """
+    Compares the results against a baseline, flagging the stages that got slower or use more memory.
+
+    Args:
+        results (dict): results of the current run.
+        baseline (dict): results of the baseline run.
+        tolerance (float): allowed relative increase, 0.25 allows measures up to 25% larger.
+        min_seconds (float): time differences below this number of seconds are considered noise.
+
+    Returns:
+        The list of regression messages.
+    """
+    regressions = []
+    for key, measures in results.items():
+        if key not in baseline:
+            continue
+
+        old_seconds = baseline[key]['seconds']
+        new_seconds = measures['seconds']
+        if new_seconds > old_seconds * (1 + tolerance) and new_seconds - old_seconds > min_seconds:
+            regressions.append(f"{key}: {old_seconds:.3f} s -> {new_seconds:.3f} s")
+
+        if 'peak_memory_mb' in measures and 'peak_memory_mb' in baseline[key]:
+            old_memory = baseline[key]['peak_memory_mb']
+            new_memory = measures['peak_memory_mb']
+            if new_memory > old_memory * (1 + tolerance) and new_memory - old_memory > 1:
+                regressions.append(f"{key}: {old_memory:.1f} MB -> {new_memory:.1f} MB")
+
+    return regressions
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmarks the preprocessing, training and evaluation stages of the "
+                                                 "pipeline over synthetic datasets.")
+    parser.add_argument('--rows', type=int, nargs='+', default=[500, 2000], help="Numbers of samples (default: 500 2000).")
+    parser.add_argument('--columns', type=int, nargs='+', default=[20, 200],
+                        help="Numbers of features (default: 20 200).")
+    parser.add_argument('--categorical-share', type=float, default=0.1,
+                        help="Fraction of categorical features (default: 0.1).")
+    parser.add_argument('--missing-share', type=float, default=0.05,
+                        help="Fraction of missing feature values (default: 0.05).")
+    parser.add_argument('--models', nargs='+', default=models, choices=models, help="Models to benchmark (default: all).")
+    parser.add_argument('--splitting-runs', type=int, default=20, help="splitting_runs of train/test (default: 20).")
+    parser.add_argument('--bootstrap-runs', type=int, default=20, help="bootstrap_runs of .632+ (default: 20).")
+    parser.add_argument('--repeats', type=int, default=3, help="Timed runs per stage, the best is kept (default: 3).")
+    parser.add_argument('--no-memory', action='store_true', help="Skips the peak memory measures.")
+    parser.add_argument('--output', default='benchmark_results.json', help="File where the results are saved.")
+    parser.add_argument('--compare', default=None, metavar='BASELINE',
+                        help="Results file of a previous run, fails if any stage regressed.")
+    parser.add_argument('--tolerance', type=float, default=0.25,
+                        help="Allowed relative increase against the baseline (default: 0.25).")
+    parser.add_argument('--min-seconds', type=float, default=0.05,
+                        help="Time differences below this are ignored in the comparison (default: 0.05).")
+    arguments = parser.parse_args()
+
+    results = {}
+    with tempfile.TemporaryDirectory() as output_path:
+        for n_rows in arguments.rows:
+            for n_columns in arguments.columns:
+                dataset_name = f"{n_rows}x{n_columns}"
+                print(f"Benchmarking dataset {dataset_name}")
+                dataframe = generate_dataset(n_rows, n_columns, categorical_share=arguments.categorical_share,
+                                             missing_share=arguments.missing_share, seed=base_parameters['seed'])
+
+                for stage, measures in benchmark_dataset(dataframe, arguments, output_path + '/').items():
+                    results[f"{dataset_name}/{stage}"] = measures
+
+    for key, measures in results.items():
+        memory = f"{measures['peak_memory_mb']:>10.1f} MB" if 'peak_memory_mb' in measures else ''
+        print(f"{key:<55}{measures['seconds']:>10.3f} s{memory}")
+
+    with open(arguments.output, 'w') as file:
+        json.dump({'metadata': {'python': platform.python_version(), 'platform': platform.platform(),
+                                'date': time.strftime('%Y-%m-%d %H:%M:%S'), 'arguments': vars(arguments)},
+                   'results': results}, file, indent=2)
+
+    if arguments.compare:
+        with open(arguments.compare, 'r') as file:
+            baseline = json.load(file)['results']
+
+        regressions = compare(results, baseline, arguments.tolerance, arguments.min_seconds)
+        for regression in regressions:
+            print("Regression: " + regression)
+        if regressions:
+            sys.exit(1)
+        print("No regressions against " + arguments.compare)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,73 @@
+import argparse
+import os
+import sys
+
+import numpy as np
+from sklearn.linear_model import LogisticRegression
+from sklearn.metrics import roc_auc_score
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from model.evaluation.bootstrap_point632 import bootstrap_point632_score
+
+
+def check_random_labels(n_rows, n_columns, n_splits, seed, max_bias):
+    """
+    Runs the .632+ bootstrap of a weak model over labels that do not depend on the features, where the true AUC is
+    0.5, and checks that every replicate estimate is a valid AUC and that their mean is close to the truth.
+
+    Args:
+        n_rows (int): number of samples.
+        n_columns (int): number of features.
+        n_splits (int): number of bootstrap replicates.
+        seed (int): seed of the data and the replicates.
+        max_bias (float): allowed distance between the mean AUC and 0.5.
+
+    Returns:
+        The list of failure messages, empty if the check passed.
+    """
+    rng = np.random.default_rng(seed)
+    X = rng.normal(size=(n_rows, n_columns))
+    y = rng.integers(0, 2, size=n_rows)
+
+    scores, _, _ = bootstrap_point632_score(LogisticRegression(C=0.01), X, y, 'logistic_regression',
+                                            [f"x{i}" for i in range(n_columns)], n_splits=n_splits, method='.632+',
+                                            scoring_func=roc_auc_score, predict_proba=True, random_seed=seed)
+
+    failures = []
+    out_of_range = np.sum((scores < 0) | (scores > 1))
+    if out_of_range:
+        failures.append(f"{out_of_range} of {len(scores)} replicate AUC estimates are outside [0, 1], "
+                        f"from {scores.min():.3f} to {scores.max():.3f}")
+    if abs(np.mean(scores) - 0.5) > max_bias:
+        failures.append(f"The mean AUC is {np.mean(scores):.3f}, more than {max_bias} away from 0.5")
+
+    return failures
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Checks that the .632+ bootstrap keeps its estimates in range over "
+                                                 "random labels.")
+    parser.add_argument('--rows', type=int, default=60, help="Number of samples (default: 60).")
+    parser.add_argument('--columns', type=int, default=3, help="Number of features (default: 3).")
+    parser.add_argument('--bootstrap-runs', type=int, default=200, help="Bootstrap replicates (default: 200).")
+    parser.add_argument('--seeds', type=int, nargs='+', default=[0, 1, 2], help="Seeds to check (default: 0 1 2).")
+    parser.add_argument('--max-bias', type=float, default=0.1,
+                        help="Allowed distance between the mean AUC and 0.5 (default: 0.1).")
+    arguments = parser.parse_args()
+
+    failures = []
+    for seed in arguments.seeds:
+        failures += [f"Seed {seed}: {failure}" for failure in
+                     check_random_labels(arguments.rows, arguments.columns, arguments.bootstrap_runs, seed,
+                                         arguments.max_bias)]
+
+    for failure in failures:
+        print(failure)
+    if failures:
+        sys.exit(1)
+    print("The .632+ estimates over random labels are in range")
+
+
+if __name__ == "__main__":
+    main()
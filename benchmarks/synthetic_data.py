@@ -0,0 +1,45 @@
+import numpy as np
+import pandas as pd
+
+
+def generate_dataset(n_rows, n_columns, categorical_share=0.1, missing_share=0.0, target='target', seed=0):
+    """
+    Generates a synthetic binary classification dataset with numerical and categorical features. The target depends
+    on a few of the numerical features through a logistic model, so every model has something to learn.
+
+    Args:
+        n_rows (int): number of samples.
+        n_columns (int): number of features, not counting the target.
+        categorical_share (float): fraction of the features that are categorical.
+        missing_share (float): fraction of the feature values that are set as missing.
+        target (string): name of the target column.
+        seed (int): seed of the random number generator.
+
+    Returns:
+        The dataframe containing the features and a 'yes'/'no' target column.
+    """
+    rng = np.random.default_rng(seed)
+
+    n_categorical = int(round(n_columns * categorical_share))
+    n_numerical = n_columns - n_categorical
+
+    numerical = rng.normal(size=(n_rows, n_numerical))
+    dataframe = pd.DataFrame(numerical, columns=[f"x{i}" for i in range(n_numerical)])
+
+    for i in range(n_categorical):
+        dataframe[f"c{i}"] = rng.choice(['a', 'b', 'c', 'd'], size=n_rows)
+
+    # The first informative features carry the signal
+    n_informative = min(5, n_numerical)
+    weights = rng.normal(size=n_informative)
+    logits = numerical[:, :n_informative] @ weights if n_informative else np.zeros(n_rows)
+    probabilities = 1 / (1 + np.exp(-logits))
+    labels = rng.random(n_rows) < probabilities
+
+    if missing_share > 0:
+        mask = rng.random(dataframe.shape) < missing_share
+        dataframe = dataframe.mask(mask)
+
+    dataframe[target] = np.where(labels, 'yes', 'no')
+
+    return dataframe
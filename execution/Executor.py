@@ -0,0 +1,133 @@
+import multiprocessing
+import random
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from functools import partial
+
+import numpy as np
+
+import resources
+import tracing
+
+from model.ModelPipeline import ModelPipeline
+from model.Plotter import Plotter
+from preprocessing.PreprocessingPipeline import PreprocessingPipeline
+
+# Input dataframe shared with the worker processes. It is only read by the pipelines, so with the 'fork' start method
+# every worker sees the parent's copy without pickling it, and with 'spawn' it is sent once per worker instead of once
+# per combination.
+_shared_dataframe = None
+
+
+def _initialize_worker(dataframe=None):
+    """
+    Initializer of every worker process, stores the input dataframe when it could not be inherited from the parent.
+
+    Args:
+        dataframe (dataframe): input data, None when the worker already inherited it through 'fork'.
+    """
+    global _shared_dataframe
+    if dataframe is not None:
+        _shared_dataframe = dataframe
+
+
+def run_combination(combination, cache=None, trace=False, cpus=None):
+    """
+    Runs the preprocessing and model pipelines for a single combination of parameters over the shared dataframe.
+
+    Args:
+        combination (dict): one of the parameter combinations generated from the parameters file.
+        cache (PreprocessingCache): on-disk cache of preprocessed datasets, None disables caching.
+        trace (bool): whether the spans of the combination are recorded in the output folder.
+        cpus (int): CPUs the combination can use, shared by its parallel jobs and their threads. None leaves the
+            defaults of the libraries.
+
+    Returns:
+        A tuple with the output dataframe row of the combination and the text block for the output.txt file.
+    """
+    # Every combination starts from its own seed so the result does not depend on the process it runs in
+    random.seed(combination['seed'])
+    np.random.seed(combination['seed'])
+
+    resources.set_cpus(cpus)
+
+    output_path = combination['output_path']
+    if trace:
+        tracing.enable(output_path)
+
+    with tracing.span('combination', model=combination['model'],
+                      evaluation_technique=combination['evaluation_technique']):
+        ### PREPROCESSING ###
+
+        with tracing.span('preprocessing'):
+            preprocessing_pipeline = PreprocessingPipeline(_shared_dataframe, combination, cache=cache)
+            local_parameters = preprocessing_pipeline.run()
+
+        ### MODEL TRAINING AND TESTING ###
+
+        model_pipeline = ModelPipeline(local_parameters, write_output_file=False)
+        output_row = model_pipeline.run()
+
+        # The plots are rendered in the background while the model is saved, they have to be finished before the
+        # combination is reported as done
+        Plotter.wait()
+
+    tracing.flush(output_path)
+
+    return output_row, model_pipeline.output_text
+
+
+class Executor:
+    """
+    Runs all the parameter combinations, either one after another or distributed over a pool of worker processes.
+    """
+
+    def __init__(self, dataframe, workers=1, cache=None, trace=False, cpus=None):
+        """
+        Initialize a new instance of Executor
+
+        Args:
+            dataframe (dataframe): input data, shared read-only by all the combinations.
+            workers (int): number of worker processes, 1 runs every combination in the current process.
+            cache (PreprocessingCache): on-disk cache of preprocessed datasets, None disables caching.
+            trace (bool): whether the spans of every combination are recorded in the output folder.
+            cpus (int): CPUs of every combination. None leaves the defaults of the libraries.
+        """
+        self.dataframe = dataframe
+        self.workers = max(1, workers)
+        self.cache = cache
+        self.trace = trace
+        self.cpus = cpus
+
+    def run(self, combinations, on_result):
+        """
+        Runs every combination, handing its result over as soon as it finishes. Results are not kept in memory, the
+        position of the combination is given with it so the caller can merge them in a deterministic order.
+
+        Args:
+            combinations (list): list of parameter combinations.
+            on_result (callable): function called in the main process with the position of the combination in the
+            list and its (output row, output text) result.
+        """
+        global _shared_dataframe
+        _shared_dataframe = self.dataframe
+
+        task = partial(run_combination, cache=self.cache, trace=self.trace, cpus=self.cpus)
+
+        workers = min(self.workers, len(combinations))
+        if workers <= 1:
+            for index, combination in enumerate(combinations):
+                on_result(index, task(combination))
+            return
+
+        if 'fork' in multiprocessing.get_all_start_methods():
+            context = multiprocessing.get_context('fork')
+            initargs = ()
+        else:
+            context = multiprocessing.get_context('spawn')
+            initargs = (self.dataframe,)
+
+        with ProcessPoolExecutor(max_workers=workers, mp_context=context, initializer=_initialize_worker,
+                                 initargs=initargs) as pool:
+            futures = {pool.submit(task, combination): index for index, combination in enumerate(combinations)}
+            for future in as_completed(futures):
+                on_result(futures.pop(future), future.result())
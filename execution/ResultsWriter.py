@@ -0,0 +1,98 @@
+import json
+import os
+from collections import OrderedDict
+
+import numpy as np
+import pandas as pd
+
+
+class ResultsWriter:
+    """
+    Append-only sink where the result of every combination is written as soon as it finishes. Each result is one
+    JSON line holding its key, the output dataframe row and the output text, so results survive a crash and only the
+    position of every line has to be kept in memory. The output.csv and output.txt files are produced from it at the
+    end of the run.
+    """
+
+    def __init__(self, path):
+        """
+        Initialize a new instance of ResultsWriter, indexing the results already present in the file.
+
+        Args:
+            path (string): path to the results file.
+        """
+        self.path = path
+        self.offsets = {}
+
+        if os.path.exists(self.path):
+            self.index()
+
+    def index(self):
+        """
+        Reads the results file storing the position of every result, an incomplete last line left by a crash is
+        removed.
+        """
+        offset = 0
+        with open(self.path, 'rb') as file:
+            for line in file:
+                if not line.endswith(b'\n'):
+                    break
+                try:
+                    self.offsets[json.loads(line)['key']] = offset
+                except (ValueError, KeyError):
+                    pass
+                offset += len(line)
+
+        # Drop the incomplete line so new results start on a line of their own
+        if offset < os.path.getsize(self.path):
+            with open(self.path, 'r+b') as file:
+                file.truncate(offset)
+
+    def __contains__(self, key):
+        return key in self.offsets
+
+    def append(self, key, output_row, output_text):
+        """
+        Appends the result of a combination with a single write and flushes it to disk.
+
+        Args:
+            key (string): identifier of the combination.
+            output_row (dataframe): output dataframe row of the combination.
+            output_text (string): text block written to output.txt for the combination.
+        """
+        row = {column: output_row[column].iloc[0] for column in output_row.columns}
+        record = {'key': key, 'row': row, 'output_text': output_text}
+        line = json.dumps(record, default=lambda value: value.item() if isinstance(value, np.generic) else str(value))
+
+        file_descriptor = os.open(self.path, os.O_WRONLY | os.O_APPEND | os.O_CREAT, 0o644)
+        try:
+            offset = os.lseek(file_descriptor, 0, os.SEEK_END)
+            os.write(file_descriptor, (line + '\n').encode())
+            os.fsync(file_descriptor)
+        finally:
+            os.close(file_descriptor)
+
+        self.offsets[key] = offset
+
+    def write_outputs(self, output_path, keys):
+        """
+        Writes output.txt and the transposed output.csv with the results of the given combinations, in the given
+        order. Both files are replaced atomically.
+
+        Args:
+            output_path (string): path to the output folder.
+            keys (list): identifiers of the combinations to include.
+        """
+        rows = []
+        text_path = os.path.join(output_path, 'output.txt')
+        with open(self.path, 'rb') as results_file, open(text_path + '.tmp', 'w') as text_file:
+            for key in keys:
+                results_file.seek(self.offsets[key])
+                record = json.loads(results_file.readline(), object_pairs_hook=OrderedDict)
+                rows.append(record['row'])
+                text_file.write(record['output_text'])
+        os.replace(text_path + '.tmp', text_path)
+
+        csv_path = os.path.join(output_path, 'output.csv')
+        pd.DataFrame(rows).T.to_csv(csv_path + '.tmp')
+        os.replace(csv_path + '.tmp', csv_path)
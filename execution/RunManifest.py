@@ -0,0 +1,77 @@
+import hashlib
+import json
+import os
+
+from execution.ResultsWriter import ResultsWriter
+
+
+class RunManifest:
+    """
+    Record of the parameter combinations that already finished in an output folder. Every combination is identified
+    by a hash of its parameters and the input data, and its result is streamed to the manifest file as soon as it
+    finishes, so an interrupted sweep can be resumed by only running the combinations that are missing.
+    """
+
+    file_name = 'manifest.jsonl'
+
+    # Parameters that do not change the result of a combination
+    ignored_parameters = ['output_path']
+
+    def __init__(self, output_path, data_hash):
+        """
+        Initialize a new instance of RunManifest, loading the combinations already recorded in the output folder.
+
+        Args:
+            output_path (string): path to the output folder.
+            data_hash (string): hash of the input file, so results obtained from other data are not reused.
+        """
+        self.output_path = output_path
+        self.data_hash = data_hash
+        self.results_writer = ResultsWriter(os.path.join(output_path, self.file_name))
+
+    def hash_combination(self, combination):
+        """
+        Generates a hash that identifies a combination of parameters over the input data.
+
+        Args:
+            combination (dict): parameter combination, before running it.
+
+        Returns:
+            The hexadecimal sha256 digest of the combination.
+        """
+        relevant_parameters = {k: v for k, v in combination.items() if k not in self.ignored_parameters}
+        content = self.data_hash + json.dumps(relevant_parameters, sort_keys=True, default=str)
+
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def is_completed(self, combination_hash):
+        """
+        Checks whether a combination already finished.
+
+        Args:
+            combination_hash (string): hash of the combination.
+
+        Returns:
+            True if the result of the combination is in the manifest.
+        """
+        return combination_hash in self.results_writer
+
+    def record(self, combination_hash, output_row, output_text):
+        """
+        Appends a completed combination to the manifest.
+
+        Args:
+            combination_hash (string): hash of the combination.
+            output_row (dataframe): output dataframe row of the combination.
+            output_text (string): text block written to output.txt for the combination.
+        """
+        self.results_writer.append(combination_hash, output_row, output_text)
+
+    def write_outputs(self, combination_hashes):
+        """
+        Writes output.txt and output.csv of the output folder from the recorded results.
+
+        Args:
+            combination_hashes (list): hashes of the combinations of the sweep, in the order they were generated.
+        """
+        self.results_writer.write_outputs(self.output_path, combination_hashes)
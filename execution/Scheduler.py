@@ -0,0 +1,149 @@
+import math
+
+
+class Scheduler:
+    """
+    Orders the parameter combinations by their estimated cost, so the most expensive ones are dispatched first and
+    the cheap ones fill the gaps at the end of a parallel run. The cost is a rough number of operations derived from
+    the model, the hyperparameter search, the evaluation technique and the shape of the data, it is only meant to rank
+    the combinations.
+    """
+
+    def __init__(self, dataframe):
+        """
+        Initialize a new instance of Scheduler
+
+        Args:
+            dataframe (dataframe): input data.
+        """
+        self.dataframe = dataframe
+        self.minority_class_sizes = {}
+
+    def schedule(self, jobs):
+        """
+        Sorts the jobs from the most to the least expensive. Jobs with the same cost keep their relative order.
+
+        Args:
+            jobs (list): list of (identifier, combination) tuples.
+
+        Returns:
+            The sorted list of jobs.
+        """
+        return sorted(jobs, key=lambda job: self.estimate_cost(job[1]), reverse=True)
+
+    def estimate_cost(self, combination):
+        """
+        Estimates the cost of running a combination as the cost of fitting its model once times the number of fits.
+
+        Args:
+            combination (dict): parameter combination.
+
+        Returns:
+            The estimated cost.
+        """
+        n_samples, n_features = self.get_data_shape(combination)
+        test_size = combination.get('test_size') or 0.3
+        grid = self.get_grid(combination)
+
+        # Hyperparameter search, repeated a few times when the grid is refined
+        n_candidates = 1
+        for values in grid.values():
+            if isinstance(values, list):
+                n_candidates *= max(1, len(values))
+        n_folds = min(15, self.get_minority_class_size(combination))
+        search_rounds = 3 if combination.get('enable_parameter_search') else 1
+
+        # The TPE search evaluates a budget of trials instead of the grid
+        if combination.get('search_strategy') == 'tpe':
+            n_candidates = combination.get('search_trials') or 50
+            search_rounds = 1
+
+        if combination.get('evaluation_technique') == 'train_test':
+            n_train = max(1, int(n_samples * (1 - test_size)))
+            evaluation_fits = 1 + (combination.get('splitting_runs') or 0)
+        else:
+            n_train = n_samples
+            evaluation_fits = 1 + (combination.get('bootstrap_runs') or 0)
+
+        search_fits = search_rounds * n_candidates * n_folds
+
+        return (search_fits + evaluation_fits) * self.fit_cost(combination['model'], grid, n_train, n_features)
+
+    def fit_cost(self, model, grid, n_samples, n_features):
+        """
+        Estimates the cost of fitting a model once, following the complexity of its training algorithm.
+
+        Args:
+            model (string): name of the model.
+            grid (dict): hyperparameters grid of the model.
+            n_samples (int): number of training samples.
+            n_features (int): number of features.
+
+        Returns:
+            The estimated cost.
+        """
+        n_samples = max(2, n_samples)
+        n_features = max(1, n_features)
+        n_estimators = grid.get('n_estimators')
+        n_estimators = max(n_estimators) if isinstance(n_estimators, list) and n_estimators else 100
+
+        if model == 'random_forest':
+            return n_estimators * n_samples * math.log2(n_samples) * math.sqrt(n_features)
+        elif model == 'xgboost':
+            return n_estimators * n_samples * n_features
+        elif model == 'rbf_svm':
+            # probability=True fits an internal 5-fold cross validation on top of the final model
+            return 6 * n_samples ** 2 * n_features
+
+        else:
+            return n_samples * n_features
+
+    def get_grid(self, combination):
+        """
+        Retrieves the hyperparameters grid that the combination will use.
+
+        Args:
+            combination (dict): parameter combination.
+
+        Returns:
+            The grid, or an empty dictionary if the default grid of the model is used.
+        """
+        parameters_grid = combination.get('parameters_grid')
+        if isinstance(parameters_grid, dict) and isinstance(parameters_grid.get(combination['model']), dict):
+            return parameters_grid[combination['model']]
+
+        return {}
+
+    def get_data_shape(self, combination):
+        """
+        Retrieves the number of samples and features the combination will be trained on.
+
+        Args:
+            combination (dict): parameter combination.
+
+        Returns:
+            A tuple with the number of samples and the number of features.
+        """
+        if combination.get('features'):
+            return self.dataframe.shape[0], len(combination['features'])
+
+        return self.dataframe.shape[0], self.dataframe.shape[1] - 1
+
+    def get_minority_class_size(self, combination):
+        """
+        Retrieves the number of samples of the least frequent class of the target, which limits the number of folds.
+
+        Args:
+            combination (dict): parameter combination.
+
+        Returns:
+            The number of samples of the minority class.
+        """
+        target = combination.get('target')
+        if target not in self.minority_class_sizes:
+            if target in self.dataframe.columns:
+                self.minority_class_sizes[target] = max(2, int(self.dataframe[target].value_counts().min()))
+            else:
+                self.minority_class_sizes[target] = 15
+
+        return self.minority_class_sizes[target]
@@ -1,15 +1,18 @@
-import copy
+import argparse
+import itertools
 import json
 import os
+import random
 import re
-import sys
 import time
 
-import matplotlib.colors as mcolors
-import pandas as pd
-
-from model.ModelPipeline import ModelPipeline
-from preprocessing.PreprocessingPipeline import PreprocessingPipeline
+from execution.Executor import Executor
+from execution.RunManifest import RunManifest
+from execution.Scheduler import Scheduler
+import resources
+import tracing
+from preprocessing.DataLoader import DataLoader
+from preprocessing.PreprocessingCache import PreprocessingCache
 
 
 def exception_control(parameters):
@@ -35,15 +38,30 @@ def exception_control(parameters):
         'model': {'valid_values': ['logistic_regression', 'random_forest', 'xgboost', 'rbf_svm', 'gradient_descent'],
                   'error_msg': 'The model is not available, the implemented model keys are: {}'},
         'enable_parameter_search': {'type': bool, 'error_msg': 'Parameter "{}" has to be a boolean'},
+        'search_strategy': {'valid_values': ['grid', 'halving', 'tpe', 'path', 'early_stopping'],
+                            'error_msg': 'The search strategy is not available, the implemented strategies are: {}'},
+        'halving_resource': {'valid_values': ['n_samples', 'n_estimators'],
+                             'error_msg': 'The halving resource is not available, the implemented resources are: {}'},
+        'search_trials': {'type': int, 'error_msg': 'Parameter "{}" has to be an integer'},
+        'search_time': {'valid_types': [int, float], 'error_msg': 'Parameter "{}" has to be a number of seconds'},
+        'search_batch_size': {'type': int, 'error_msg': 'Parameter "{}" has to be an integer'},
+        'kernel_dtype': {'valid_values': ['float64', 'float32'],
+                         'error_msg': 'The kernel precision is not available, the implemented precisions are: {}'},
         'splitting_runs': {'type': int, 'error_msg': 'Parameter "{}" has to be an integer'},
         'bootstrap_runs': {'type': int, 'error_msg': 'Parameter "{}" has to be an integer'},
+        'bootstrap_tolerance': {'type': float, 'error_msg': 'Parameter "{}" has to be a float'},
+        'bootstrap_min_runs': {'type': int, 'error_msg': 'Parameter "{}" has to be an integer'},
         'output_path': {'type': str, 'error_msg': 'Parameter "{}" has to be a string'},
         'num_features': {'type': int, 'error_msg': 'Parameter "{}" has to be an integer'},
         'feature_selector': {'type': str, 'error_msg': 'Parameter "{}" has to be a string'},
         'parameters_grid': {'valid_types': [str, dict], 'error_msg': 'Parameter "{}" has to be a string'},
         'plot_mean_roc': {'type': bool, 'error_msg': 'Parameter "{}" has to be a boolean'},
         'roc_color': {'type': str, 'error_msg': 'The given color is not correct'},
-        'test_size': {'type': float, 'error_msg': 'Parameter "{}" has to be a float'}
+        'test_size': {'type': float, 'error_msg': 'Parameter "{}" has to be a float'},
+        'seed': {'type': int, 'error_msg': 'Parameter "{}" has to be an integer'},
+        'n_jobs': {'type': int, 'error_msg': 'Parameter "{}" has to be an integer'},
+        'plots': {'valid_values': ['none', 'png', 'pdf', 'both'],
+                  'error_msg': 'The plots option is not available, the implemented options are: {}'}
     }
 
     for k, v in parameters.items():
@@ -63,35 +81,30 @@ def exception_control(parameters):
                 raise ValueError(valid_parameters[k]['error_msg'].format(", ".join(valid_values)))
 
         if k == 'roc_color':
+            import matplotlib.colors as mcolors
             if (v not in list(mcolors.CSS4_COLORS.keys())) and (not bool(re.match(r'^#[0-9a-fA-F]{6}$', v))):
                 raise ValueError(valid_parameters[k]['error_msg'])
 
 
-def generate_combinations(json_obj, current_combination, combinations_list):
+def generate_combinations(parameters):
     """
     In case any of the parameters has multiple options it generates all the possible combination between the different
-    parameters so the pipeling is run as many times as combinations exist.
+    parameters so the pipeling is run as many times as combinations exist. Combinations are generated lazily, one at a
+    time, and the values that are not combined are shared between them instead of copied.
 
     Args:
-        json_obj (dict): JSON object containing all the parameters.
-        current_combination (dict): already converted dictionary from the JSON file.
-        combinations_list (dict): list of converted dictionaries.
-    """
+        parameters (dict): JSON object containing all the parameters.
 
-    if not json_obj:
-        combinations_list.append(current_combination)
-        return
+    Yields:
+        The dictionary of parameters of every combination.
+    """
+    # The last parameter of the file is the one that changes slowest, as it always has been
+    keys = list(reversed(parameters.keys()))
+    options = [parameters[key] if ("features" not in key) and isinstance(parameters[key], list) else [parameters[key]]
+               for key in keys]
 
-    key, value = json_obj.popitem()
-
-    if ("features" not in key) and isinstance(value, list):
-        for item in value:
-            new_combination = copy.deepcopy(current_combination)
-            new_combination[key] = item
-            generate_combinations(json_obj.copy(), new_combination, combinations_list)
-    else:
-        current_combination[key] = value
-        generate_combinations(json_obj, current_combination, combinations_list)
+    for values in itertools.product(*options):
+        yield dict(zip(keys, values))
 
 
 def create_output_folder(parameters):
@@ -116,6 +129,24 @@ def create_output_folder(parameters):
     parameters['output_path'] = output_path + '/'
 
 
+def get_required_columns(parameters):
+    """
+    Collects the columns of the data that are used by any of the combinations, so the rest of them are not read.
+
+    Args:
+        parameters (dict): dictionary containing all the parameters.
+
+    Returns:
+        The list of features and targets, or None if all the columns are needed.
+    """
+    if 'features' not in parameters or not parameters['features']:
+        return None
+
+    targets = parameters['target'] if isinstance(parameters['target'], list) else [parameters['target']]
+
+    return parameters['features'] + [target for target in targets if target not in parameters['features']]
+
+
 def get_parameters_grid(parameters):
     try:
         with open(parameters['parameters_grid'], "r") as json_file:
@@ -125,19 +156,41 @@ def get_parameters_grid(parameters):
         print("Could not convert the parameters grid file to a dictionary, assigning default parameters.")
         return ""
 
+def parse_arguments():
+    """
+    Parses the command-line arguments of the pipeline.
+
+    Returns:
+        The namespace containing the path to the data, the path to the parameters file and the execution options.
+    """
+    parser = argparse.ArgumentParser(description="Machine Learning pipeline for binary classification.")
+    parser.add_argument('data', help="Path to the data, either a comma separated csv, Parquet, Feather or Arrow IPC "
+                                     "file, chosen by its extension.")
+    parser.add_argument('parameters', help="Path to the JSON file containing the parameters.")
+    parser.add_argument('--workers', type=int, default=1,
+                        help="Number of processes used to run the parameter combinations in parallel (default: 1).")
+    parser.add_argument('--cpus', type=int, default=None,
+                        help="Number of CPUs of the whole run, divided between the workers, the parallel jobs of "
+                             "every combination and the threads of the estimators and BLAS (default: all of them).")
+    parser.add_argument('--cache-dir', default=None,
+                        help="Directory where preprocessed datasets are cached across runs (default: no caching).")
+    parser.add_argument('--cache-size', type=float, default=10,
+                        help="Maximum size of the preprocessing cache in GB (default: 10).")
+    parser.add_argument('--resume', default=None, metavar='OUTPUT_FOLDER',
+                        help="Output folder of a previous run to complete, finished combinations are not run again.")
+    parser.add_argument('--csv-engine', choices=['auto', 'pyarrow', 'c'], default='auto',
+                        help="Reader used for csv files, 'auto' uses pyarrow when it is installed (default: auto).")
+    parser.add_argument('--trace', action='store_true',
+                        help="Records the time, CPU and memory of every stage in trace.json (Chrome trace format) and "
+                             "trace_summary.txt in the output folder.")
+
+    return parser.parse_args()
+
+
 def main():
-    # Check if command-line arguments were provided
-    if len(sys.argv) < 2:
-        print("Usage: python script.py argument1 argument2")
-        return
-
-    if len(sys.argv) < 3:
-        # Access command-line arguments
-        arg1 = sys.argv[0]
-        arg2 = sys.argv[1]
-    else:
-        arg1 = sys.argv[1]
-        arg2 = sys.argv[2]
+    arguments = parse_arguments()
+    arg1 = arguments.data
+    arg2 = arguments.parameters
 
     # We need to convert our arg2 into a dictionary of parameters
     try:
@@ -152,13 +205,19 @@ def main():
 
     # We read the data from our first parameter
     try:
-        # We read our data from the path extracted from arg1
-        dataframe = pd.read_csv(arg1)
+        # We read our data from the path extracted from arg1, only the columns that are going to be used
+        data_loader = DataLoader(arg1, columns=get_required_columns(parameters), csv_engine=arguments.csv_engine)
+        dataframe = data_loader.load()
     except (ValueError, SyntaxError):
-        raise ValueError("Data has to be in a comma separated csv format")
+        raise ValueError("Data has to be in a comma separated csv, Parquet, Feather or Arrow IPC format")
 
-    # Check if output dir exists and create it if not
-    create_output_folder(parameters)
+    # Check if output dir exists and create it if not, unless a previous run is being resumed
+    if arguments.resume:
+        if not os.path.isdir(arguments.resume):
+            raise ValueError("The output folder to resume does not exist: " + arguments.resume)
+        parameters['output_path'] = os.path.join(arguments.resume, '')
+    else:
+        create_output_folder(parameters)
 
     if 'parameters_grid' in parameters and parameters['parameters_grid']:
         if not isinstance(parameters['parameters_grid'], dict) and os.path.exists(parameters['parameters_grid']):
@@ -166,28 +225,56 @@ def main():
         elif isinstance(parameters['model'], list) and len(parameters['model']) > 1:
             parameters['parameters_grid'] = ""
 
-    combinations = []
-    generate_combinations(parameters.copy(), {}, combinations)
+    combinations = generate_combinations(parameters)
 
-    output_dataframe = pd.DataFrame()
-    # We iterate through all the possible parameter combinations.
+    data_hash = PreprocessingCache.hash_file(arg1)
+    manifest = RunManifest(parameters['output_path'], data_hash)
+
+    combination_hashes = []
+    pending_combinations = []
     for combination in combinations:
         # Raises an exception if any of the parameters is incorrect
         exception_control(combination)
 
-        ### PREPROCESSING ###
+        # Combinations that already finished in the output folder are not run again
+        combination_hash = manifest.hash_combination(combination)
+        combination_hashes.append(combination_hash)
+        if manifest.is_completed(combination_hash):
+            continue
+
+        # Seeds are drawn here so every combination gets the same one regardless of the process that runs it
+        if 'seed' not in combination or not combination['seed']:
+            combination['seed'] = random.randint(1, 999999)
+
+        pending_combinations.append((combination_hash, combination))
 
-        preprocessing_pipeline = PreprocessingPipeline(dataframe, combination)
-        local_parameters = preprocessing_pipeline.run()
+    if len(pending_combinations) < len(combination_hashes):
+        print(f"Resuming run: {len(combination_hashes) - len(pending_combinations)} of {len(combination_hashes)} "
+              f"combinations already finished.")
 
-        ### MODEL TRAINING AND TESTING ###
+    # The most expensive combinations are dispatched first so they do not become the tail of the run
+    scheduler = Scheduler(dataframe)
+    pending_combinations = scheduler.schedule(pending_combinations)
 
-        model_pipeline = ModelPipeline(local_parameters)
-        aux = model_pipeline.run()
-        output_dataframe = pd.concat([output_dataframe, aux], ignore_index=True)
+    cache = None
+    if arguments.cache_dir:
+        cache = PreprocessingCache(arguments.cache_dir, data_hash, max_size=int(arguments.cache_size * 1024 ** 3))
+
+    # Every result is streamed to the manifest as soon as its combination finishes
+    def record_result(index, result):
+        output_row, output_text = result
+        manifest.record(pending_combinations[index][0], output_row, output_text)
+
+    # We iterate through all the possible parameter combinations.
+    # The CPUs are divided between the workers, and every combination divides its share between its jobs and threads
+    workers, combination_cpus = resources.split_cpus(arguments.cpus, arguments.workers)
+    executor = Executor(dataframe, workers=workers, cache=cache, trace=arguments.trace, cpus=combination_cpus)
+    executor.run([combination for _, combination in pending_combinations], on_result=record_result)
 
-    output_dataframe.T.to_csv(parameters['output_path'] + 'output.csv')
+    manifest.write_outputs(combination_hashes)
 
+    if arguments.trace:
+        tracing.write_trace(parameters['output_path'])
 
 if __name__ == "__main__":
     start_time = time.time()
@@ -5,21 +5,27 @@ from joblib import dump
 import os
 import json
 
+import tracing
+
 
 class ModelPipeline:
     """
     Pipeline in charge of running all the train/test/evaluation procedure.
     """
 
-    def __init__(self, parameters):
+    def __init__(self, parameters, write_output_file=True):
         """
         Initialize a new instance of ModelPipeline
 
         Args:
             parameters (dictionary): Set of parameters that contain all the needed information for
             running the pipeline.
+            write_output_file (bool): whether the summary of the run is appended to output.txt, when disabled it is
+            only kept in output_text so the caller can write it.
         """
         self.parameters = parameters
+        self.write_output_file = write_output_file
+        self.output_text = ""
 
     def run(self):
         """
@@ -35,23 +41,29 @@ class ModelPipeline:
             self.parameters['parameters_grid'] = ""
 
         # We instantiate the training pipeline and we train the model
-        training_pipeline = Train(self.parameters)
-        model, best_params = training_pipeline.train()
+        with tracing.span('train', model=self.parameters['model']):
+            training_pipeline = Train(self.parameters)
+            model, best_params = training_pipeline.train()
 
         self.parameters['best_params'] = best_params
 
         # We collect all the evaluation metrics from the trained model
-        evaluation_pipeline = EvaluationPipeline(model, self.parameters)
-        evaluation_results = evaluation_pipeline.evaluate()
+        with tracing.span('evaluation', technique=self.parameters['evaluation_technique']):
+            evaluation_pipeline = EvaluationPipeline(model, self.parameters)
+            evaluation_results = evaluation_pipeline.evaluate()
 
         self.parameters['evaluation_results'] = evaluation_results
 
         # We generate a file containing all the details of this run
         output_generator = Output(self.parameters)
 
-        dump(model, self.parameters['output_path'] + self.parameters['model'] + 'model.joblib')
+        with tracing.span('output/model_dump'):
+            dump(model, self.parameters['output_path'] + self.parameters['model'] + 'model.joblib')
 
         # Generate output file
-        output_generator.generate_output_file()
+        with tracing.span('output/output_file'):
+            self.output_text = output_generator.generate_output_text()
+            if self.write_output_file:
+                output_generator.generate_output_file()
 
         return output_generator.generate_dataframe()
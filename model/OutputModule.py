@@ -34,13 +34,19 @@ class Output:
         del self.parameters['y_test']
         del self.parameters['dataframe']
         del self.parameters['parameters_grid']
+        self.parameters.pop('kernel_cache', None)
 
         # Round metrics values to 4 decimals
         for key, value in self.parameters['evaluation_results'].items():
             self.parameters['evaluation_results'][key] = round(value, 4)
 
         for key, value in self.parameters.items():
-            if isinstance(value, dict) and key is not 'feature_importances':
+            # Only the totals of the hyperparameter search rounds are written, the detail goes to the text output
+            if key == 'search_rounds':
+                columns += ['search_rounds', 'search_cache_hits', 'search_time']
+                values += [len(value), sum(search_round['cached'] for search_round in value),
+                           round(sum(search_round['seconds'] for search_round in value), 2)]
+            elif isinstance(value, dict) and key not in ('feature_importances', 'feature_importance_intervals'):
                 for sub_key, sub_value in value.items():
                     columns.append(sub_key)
                     values.append(sub_value)
@@ -50,19 +56,35 @@ class Output:
 
         return pd.DataFrame([values], columns=columns)
 
-    def generate_output_file(self):
-        with open(self.parameters['output_path'] + 'output.txt', 'a') as file:
-            file.write(f"Results for {self.parameters['model']}, N={self.parameters['sample_size']}:\n\n")
-            file.write(f"Class balancer: {self.parameters['class_balancer']}, scaler: {self.parameters['scaler']}, encoder: {self.parameters['encoder']}, "
-                       f"imputer: {self.parameters['imputer']} \n\n")
-            file.write(f"Feature selector: {self.parameters['feature_selector']}, number of features to select: {self.parameters['num_features']} \n\n")
-            file.write(f"Target variable: {self.parameters['target']}\n\n")
+    def generate_output_text(self):
+        """
+        Method used for generating the summary of a particular run that is stored in the output.txt file.
+
+        Returns:
+            A string containing the summary of the run.
+        """
+        feature_importances = ', '.join([f"('{key}', {value})" for key, value in self.parameters['feature_importances'].items()])
+        feature_importance_intervals = ', '.join(
+            [f"('{key}', {value['mean']} ± {value['std']}, 95% [{value['lower']}, {value['upper']}])"
+             for key, value in self.parameters.get('feature_importance_intervals', {}).items()])
+        search_rounds = '; '.join(
+            [f"round {search_round['round']}: {search_round['candidates']} candidates, {search_round['cached']} cached, "
+             f"{search_round['seconds']} s" for search_round in self.parameters.get('search_rounds', [])])
+        scores_dictionary = self.parameters['evaluation_results']
 
-            feature_importances = ', '.join([f"('{key}', {value})" for key, value in self.parameters['feature_importances'].items()])
+        return (f"Results for {self.parameters['model']}, N={self.parameters['sample_size']}:\n\n"
+                f"Class balancer: {self.parameters['class_balancer']}, scaler: {self.parameters['scaler']}, encoder: {self.parameters['encoder']}, "
+                f"imputer: {self.parameters['imputer']} \n\n"
+                f"Feature selector: {self.parameters['feature_selector']}, number of features to select: {self.parameters['num_features']} \n\n"
+                f"Target variable: {self.parameters['target']}\n\n"
+                f"Feature importances: {feature_importances} \n\n"
+                f"Feature importance stability (mean ± std, 95% interval): {feature_importance_intervals} \n\n"
+                f"Hyperparameters: {self.parameters['best_params']} \n\n"
+                f"Hyperparameter search: {search_rounds} \n\n"
+                f"Scores: Accuracy = {scores_dictionary['accuracy']}, Precision = {scores_dictionary['precision']}, "
+                f"Recall = {scores_dictionary['recall']}, F1 = {scores_dictionary['f1']}, AUC = {scores_dictionary['auc']}\n\n"
+                "-------------------------------------------\n\n")
 
-            file.write(f"Feature importances: {feature_importances} \n\n")
-            file.write(f"Hyperparameters: {self.parameters['best_params']} \n\n")
-            scores_dictionary = self.parameters['evaluation_results']
-            file.write(f"Scores: Accuracy = {scores_dictionary['accuracy']}, Precision = {scores_dictionary['precision']}, "
-                       f"Recall = {scores_dictionary['recall']}, F1 = {scores_dictionary['f1']}, AUC = {scores_dictionary['auc']}\n\n")
-            file.write("-------------------------------------------\n\n")
+    def generate_output_file(self):
+        with open(self.parameters['output_path'] + 'output.txt', 'a') as file:
+            file.write(self.generate_output_text())
@@ -0,0 +1,111 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import tracing
+
+
+class Plotter:
+    """
+    Renders the plots of the pipeline on a background thread, so training and evaluation do not wait for them. The
+    figures are built with the object-oriented matplotlib API on the headless Agg canvas, so no GUI backend is ever
+    loaded and every figure is released once it has been saved.
+    """
+
+    # Formats written for every value of the 'plots' parameter
+    formats = {'none': [], 'png': ['png'], 'pdf': ['pdf'], 'both': ['pdf', 'png']}
+
+    # A single rendering thread per process, created when the first plot is requested
+    _executor = None
+    _futures = []
+    _lock = threading.Lock()
+
+    @classmethod
+    def get_formats(cls, parameters):
+        """
+        Retrieves the formats of the plots requested in the parameters.
+
+        Args:
+            parameters (dict): parameters of the combination.
+
+        Returns:
+            The list of file extensions, empty if no plots have to be rendered.
+        """
+        return cls.formats[parameters.get('plots') or 'both']
+
+    @classmethod
+    def submit(cls, function, *args):
+        """
+        Schedules the rendering of a plot on the background thread.
+
+        Args:
+            function (callable): function that renders and saves the plot.
+            args: arguments of the function.
+        """
+        with cls._lock:
+            if cls._executor is None:
+                cls._executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix='plotter')
+            cls._futures.append(cls._executor.submit(function, *args))
+
+    @classmethod
+    def wait(cls):
+        """
+        Waits until all the scheduled plots have been saved, raising the error of any plot that failed.
+        """
+        with cls._lock:
+            futures, cls._futures = cls._futures, []
+
+        for future in futures:
+            future.result()
+
+    @staticmethod
+    def render_roc(path, formats, curve, color, linestyle, averaged_auc, overoptimistic_curve, overoptimistic_auc):
+        """
+        Renders and saves the ROC curve plot.
+
+        Args:
+            path (string): path of the plot files, without extension.
+            formats (list): file extensions to be written.
+            curve (dict): grid of false positive rates ('fpr'), mean true positive rates ('mean_tpr'), optional 95%
+                band ('lower_tpr', 'upper_tpr') and optional individual runs ('curves').
+            color (string): color of the mean curve.
+            linestyle (string): line style of the mean curve.
+            averaged_auc (float): AUC shown in the legend.
+            overoptimistic_curve (list): roc curve for the overoptimistic run, empty if there is none.
+            overoptimistic_auc (float): the overoptimistic AUC.
+        """
+        # Plotting libraries are only imported once a plot is needed
+        from matplotlib.backends.backend_agg import FigureCanvasAgg
+        from matplotlib.figure import Figure
+
+        with tracing.span('plotting/roc'):
+            figure = Figure(figsize=(8, 8))
+            FigureCanvasAgg(figure)
+            axes = figure.add_subplot()
+
+            try:
+                # Plots the overoptimistic curve if .632+ was selected as evaluation technique
+                if overoptimistic_curve:
+                    axes.plot(overoptimistic_curve[0], overoptimistic_curve[1], color='navy', lw=2,
+                              linestyle='dotted', label='Overoptimistic AUC: ' + str(round(overoptimistic_auc, 2)))
+
+                # Plots all the runs
+                for tpr in curve.get('curves') or []:
+                    axes.plot(curve['fpr'], tpr, lw=1, color='grey')
+
+                axes.plot(curve['fpr'], curve['mean_tpr'], color=color, lw=2, linestyle=linestyle,
+                          label='Averaged AUC: ' + str(round(averaged_auc, 2)))
+
+                # 95% band of the runs
+                if 'lower_tpr' in curve:
+                    axes.fill_between(curve['fpr'], curve['lower_tpr'], curve['upper_tpr'], color=color, alpha=0.2,
+                                      label='95% interval')
+
+                axes.set_xlabel('1 - Specificity (FPR)')
+                axes.set_ylabel('Sensitivity (TPR)')
+                axes.set_title('Receiver Operating Characteristic (ROC) Curve')
+                axes.legend(loc='lower right')
+
+                for extension in formats:
+                    figure.savefig(path + '.' + extension)
+            finally:
+                figure.clear()
@@ -1,8 +1,4 @@
-from model.models.GradientDescent import GradientDescent
-from model.models.LogisticRegression import LogisticRegression
-from model.models.RBF_SVM import RBF_SVM
-from model.models.RandomForest import RandomForest
-from model.models.XGBoost import XGBoost
+import registry
 
 
 class Train:
@@ -28,29 +24,10 @@ class Train:
             best_params (dictionary): dictionary containing the best hyperparameters for this model.
 
         """
-        if self.parameters['model'] == 'logistic_regression':
-            model = LogisticRegression(self.parameters)
-            model = model.train()
-            best_params = model.best_params_
-
-        elif self.parameters['model'] == 'random_forest':
-            model = RandomForest(self.parameters)
-            model = model.train()
-            best_params = model.best_params_
-
-        elif self.parameters['model'] == 'xgboost':
-            model = XGBoost(self.parameters)
-            model = model.train()
-            best_params = model.best_params_
-
-        elif self.parameters['model'] == 'rbf_svm':
-            model = RBF_SVM(self.parameters)
-            model = model.train()
-            best_params = model.best_params_
-
-        elif self.parameters['model'] == 'gradient_descent':
-            model = GradientDescent(self.parameters)
-            model = model.train()
-            best_params = model.best_params_
+        # Only the module of the selected model (and its library) is imported
+        model_class = registry.load('model', self.parameters['model'])
+        model = model_class(self.parameters)
+        model = model.train()
+        best_params = model.best_params_
 
         return model, best_params
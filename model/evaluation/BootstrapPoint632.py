@@ -1,10 +1,29 @@
+from functools import partial
+
 import numpy as np
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, auc, roc_curve, roc_auc_score
 
+import resources
 from model.evaluation.EvaluateModel import EvaluateModel
+from model.evaluation.MetricsEngine import MetricsEngine
 from model.evaluation.bootstrap_point632 import bootstrap_point632_score
 
 
+def brier_score(metrics_engine, y_true, y_pred, sample_weight=None):
+    """
+    Complement of the Brier score loss, so that higher values are better like in the rest of the metrics.
+
+    Args:
+        metrics_engine (MetricsEngine): engine computing the Brier score loss.
+        y_true (array): true labels.
+        y_pred (array): probabilistic predictions.
+        sample_weight (array): weights of the samples.
+
+    Returns:
+        One minus the Brier score loss.
+    """
+    return 1 - metrics_engine.score('brier_score', y_true, y_pred, sample_weight=sample_weight)
+
+
 class BootstrapPoint632(EvaluateModel):
     """
     Class including all methods for Botstrap .632+ method.
@@ -27,27 +46,40 @@ class BootstrapPoint632(EvaluateModel):
         Returns:
             The dictionary containing all the different metrics.
         """
-        # callable_metrics = {'auc': roc_auc_score, 'accuracy': accuracy_score, 'precision': precision_score,
-        #                     'recall': recall_score, 'f1': f1_score}
-        callable_metrics = {'auc': roc_auc_score}
-        metrics = {'auc': 0, 'accuracy': 0, 'precision': 0, 'recall': 0, 'f1': 0}
+        # Every metric is computed from the same fitted replicates
+        metrics_engine = MetricsEngine()
+        callable_metrics = {name: metrics_engine.scorer(name)
+                            for name in ['auc', 'accuracy', 'precision', 'recall', 'f1', 'brier_score']}
+        callable_metrics['brier_score'] = partial(brier_score, metrics_engine)
+        proba_metrics = {'auc', 'brier_score'}
 
         X = self.parameters['X_train']
         y = self.parameters['y_train']
 
+        # The replicates share the CPUs of the combination with the threads of their estimators
+        n_jobs, threads = resources.allocate(self.parameters.get('n_jobs') or 1, n_tasks=self.runs)
         model, _ = self.instantiate_model(X, y, model_type=self.parameters['model'],
-                                           params=self.parameters['best_params'])
+                                           params=self.parameters['best_params'], threads=threads)
 
         feature_names = self.parameters['X_train'].columns.tolist()
 
-        for k, v in callable_metrics.items():
-            scores, feature_importances = bootstrap_point632_score(model, X, y, self.parameters['model'], feature_names, n_splits=self.runs, method='.632+', scoring_func=v,
-                                              predict_proba=(k == 'auc' or k == 'roc'))
+        # The replicates of the SVM are fitted on the kernel of the training data, reusing its distances
+        kernel_cache = self.get_kernel_cache(X) if self.parameters['model'] == 'rbf_svm' else None
+
+        # With a tolerance the bootstrap stops once the standard error of the AUC is within it
+        with resources.limits(threads):
+            scores, feature_importances, runs_used = bootstrap_point632_score(
+                model, X, y, self.parameters['model'], feature_names, n_splits=self.runs, method='.632+',
+                scoring_func=callable_metrics, predict_proba=proba_metrics, random_seed=self.parameters['seed'],
+                n_jobs=n_jobs, tolerance=self.parameters.get('bootstrap_tolerance') or None,
+                min_splits=min(self.parameters.get('bootstrap_min_runs') or 100, self.runs), monitor='auc',
+                kernel_cache=kernel_cache)
 
-            if k == 'auc':
-                self.parameters['feature_importances'] = feature_importances
+        self.parameters['bootstrap_runs_used'] = runs_used
+        self.store_feature_importances(feature_importances)
 
-            score = np.mean(scores)
-            metrics[k] = score
+        metrics = {k: np.mean(v) for k, v in scores.items()}
+        # The bootstrap estimates 1 - Brier score, as it works with scores where higher is better
+        metrics['brier_score'] = 1 - metrics['brier_score']
 
         return metrics
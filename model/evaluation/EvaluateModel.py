@@ -1,14 +1,8 @@
-from scipy.interpolate import interp1d
-from sklearn.metrics import accuracy_score, precision_score, recall_score, f1_score, auc, roc_curve
-from sklearn.linear_model import LogisticRegression
-from sklearn.ensemble import RandomForestClassifier
-from sklearn.linear_model import SGDClassifier
-import xgboost as xgb
-import matplotlib.pyplot as plt
-import numpy as np
-from sklearn.svm import SVC
-from sklearn.calibration import calibration_curve
-from sklearn.metrics import brier_score_loss
+import registry
+import resources
+from model.Plotter import Plotter
+from model.evaluation.MetricsEngine import MetricsEngine
+from model.models.KernelCache import KernelCache
 
 
 def get_feature_importances(model, model_type, feature_names):
@@ -54,7 +48,8 @@ class EvaluateModel:
     Superclass for the different evaluation techniques implemented in the pipeline, contains all the common methods
     """
 
-    def instantiate_model(self, X_train, y_train, model_type, params):
+    def instantiate_model(self, X_train, y_train, model_type, params, feature_names=None, threads=None,
+                          precomputed=False, random_state=None):
         """
         Fits the model to the data passed as parameters and retrieves the feature importances
 
@@ -63,73 +58,91 @@ class EvaluateModel:
             y_train (array): target data.
             model_type (string): model to be instantiated.
             params (dictionary): dictionary containing the optimized hyperparameters of the model
+            feature_names (list): names of the features, taken from the training data of the parameters if None.
+            threads (int): threads of the estimator, its default if None.
+            precomputed (bool): whether the training data is the RBF kernel of the SVM instead of its samples.
+            random_state (int): seed of the models without a fixed random_state, so the fit gives the same results in
+                whichever process it runs without touching the global generator.
 
         Returns:
             The fitted model and a dictionary containing the feature importances.
         """
-        if model_type == 'xgboost':
-            model = xgb.XGBClassifier(**params)
-        elif model_type == 'random_forest':
-            model = RandomForestClassifier(**params)
-        elif model_type == 'logistic_regression':
-            model = LogisticRegression(**params)
+        estimator_class = registry.load('estimator', model_type)
+        if model_type == 'rbf_svm' and precomputed:
+            model = estimator_class(kernel='precomputed', probability=True,
+                                    **{parameter: value for parameter, value in params.items() if parameter != 'gamma'})
         elif model_type == 'rbf_svm':
-            model = SVC(kernel='rbf', probability=True, **params)
-        elif model_type == 'gradient_descent':
-            model = SGDClassifier(**params)
+            model = estimator_class(kernel='rbf', probability=True, **params)
+        else:
+            model = estimator_class(**params)
+        model.set_params(**resources.estimator_threads(model.get_params(), threads))
+        if random_state is not None and model.get_params().get('random_state', 0) is None:
+            model.set_params(random_state=random_state)
 
         model.fit(X_train, y_train)
 
-        feature_names = self.parameters['X_train'].columns.tolist()
+        if feature_names is None:
+            feature_names = self.parameters['X_train'].columns.tolist()
         feature_importances = get_feature_importances(model, model_type, feature_names)
 
         return model, feature_importances
 
-    def plot_roc(self, metrics_df, averaged_auc, overoptimistic_auc=0, overoptimistic_curve=[]):
+    def get_kernel_cache(self, X):
         """
-        Plots and saves the roc curve plot.
+        Retrieves the kernel cache of the samples, reusing the one built during the training if it has the same
+        samples.
 
         Args:
-            metrics_df (dataframe): The dataframe containing all the metrics.
-            averaged_auc (float): the mean Area Under the Curve of the different runs.
-            overoptimistic_auc (float): the overoptimistic AUC.
-            overoptimistic_curve (list): roc curve for the overoptimistic run.
+            X (dataframe or array): samples of the dataset.
 
+        Returns:
+            The kernel cache.
         """
-        plt.figure(figsize=(8, 8))
+        kernel_cache = self.parameters.get('kernel_cache')
+        if kernel_cache is None or not kernel_cache.matches(X):
+            kernel_cache = KernelCache(X, dtype=self.parameters.get('kernel_dtype') or 'float64')
 
-        # Plots the overoptimistic curve if .632+ was selected as evaluation technique
-        if overoptimistic_curve:
-            plt.plot(overoptimistic_curve[0], overoptimistic_curve[1], color='navy', lw=2, linestyle='dotted',
-                     label='Overoptimistic AUC: ' + str(round(overoptimistic_auc, 2)))
+        return kernel_cache
 
-        tpr_values = metrics_df['tpr'].tolist()
-        fpr_values = metrics_df['fpr'].tolist()
+    def store_feature_importances(self, aggregator):
+        """
+        Stores the mean feature importances, and their standard deviation and 95% interval, in the parameters.
 
-        # Find the minimum and maximum false positive rates across all runs
-        min_fpr = min(np.min(run_fpr) for run_fpr in fpr_values)
-        max_fpr = max(np.max(run_fpr) for run_fpr in fpr_values)
+        Args:
+            aggregator (FeatureImportanceAggregator): feature importances aggregated over the runs.
+        """
+        self.parameters['feature_importances'] = aggregator.mean_importances()
+        self.parameters['feature_importance_intervals'] = aggregator.summary()
+
+    def plot_roc(self, roc_accumulator, averaged_auc, overoptimistic_auc=0, overoptimistic_curve=[]):
+        """
+        Schedules the roc curve plot, which is rendered and saved on a background thread in the formats of the 'plots'
+        parameter.
+
+        Args:
+            roc_accumulator (RocAccumulator): ROC curves of the different runs on a common grid.
+            averaged_auc (float): the mean Area Under the Curve of the different runs.
+            overoptimistic_auc (float): the overoptimistic AUC.
+            overoptimistic_curve (list): roc curve for the overoptimistic run.
 
-        # Choose a common set of mean_fpr values within the range
-        mean_fpr = np.linspace(min_fpr, max_fpr, 100)
+        """
+        formats = Plotter.get_formats(self.parameters)
+        if not formats:
+            return
 
-        # Interpolate individual ROC curves to the common set of mean_fpr values
-        interp_tpr_values = [interp1d(fpr, tpr, kind='linear', fill_value='extrapolate')(mean_fpr) for fpr, tpr in
-                             zip(fpr_values, tpr_values)]
+        # The plot only receives a copy of the aggregated curve
+        curve = {'fpr': roc_accumulator.fpr.copy(), 'mean_tpr': roc_accumulator.mean_tpr.copy()}
 
         # Plots all the runs
-        if not self.parameters['plot_mean_roc']:
+        if not self.parameters['plot_mean_roc'] and roc_accumulator.curves is not None:
             linestyle = '--'
-            for index, row in metrics_df.iterrows():
-                tpr = row['tpr']
-                fpr = row['fpr']
-
-                plt.plot(fpr, tpr, lw=1, color='grey')
+            curve['curves'] = [tpr.copy() for tpr in roc_accumulator.curves]
         # Only the mean ROC curve is plotted
         else:
             linestyle = 'solid'
 
-        mean_tpr = np.mean(interp_tpr_values, axis=0)
+        if roc_accumulator.count > 1:
+            curve['lower_tpr'], curve['upper_tpr'] = roc_accumulator.band()
 
         if overoptimistic_auc != 0:
             averaged_auc = overoptimistic_auc - averaged_auc
@@ -139,17 +152,8 @@ class EvaluateModel:
         else:
             color = 'red'
 
-        plt.plot(mean_fpr, mean_tpr, color=color, lw=2, linestyle=linestyle,
-                 label='Averaged AUC: ' + str(round(averaged_auc, 2)))
-
-        plt.xlabel('1 - Specificity (FPR)')
-        plt.ylabel('Sensitivity (TPR)')
-        plt.title('Receiver Operating Characteristic (ROC) Curve')
-        plt.legend(loc='lower right')
-
-        # Save the figure in pdf & png
-        plt.savefig(self.parameters['output_path'] + self.parameters['model'] + '_roc.pdf')
-        plt.savefig(self.parameters['output_path'] + self.parameters['model'] + '_roc.png')
+        Plotter.submit(Plotter.render_roc, self.parameters['output_path'] + self.parameters['model'] + '_roc', formats,
+                       curve, color, linestyle, averaged_auc, overoptimistic_curve, overoptimistic_auc)
 
     def compute_metrics(self, y_true, y_pred, y_pred_proba):
         """
@@ -164,39 +168,14 @@ class EvaluateModel:
         Returns:
             The dictionary containing all the evaluation metrics.
         """
-        # Initialize the dictionary to store evaluation results
-        evaluation_results = {}
+        metrics = MetricsEngine().compute(y_true, y_pred, y_pred_proba)
 
-        # Calculate and store accuracy
-        accuracy = accuracy_score(y_true, y_pred)
-        evaluation_results['accuracy'] = accuracy
-
-        # Calculate and store precision
-        precision = precision_score(y_true, y_pred, average='weighted')
-        evaluation_results['precision'] = precision
-
-        # Calculate and store recall
-        recall = recall_score(y_true, y_pred, average='weighted')
-        evaluation_results['recall'] = recall
-
-        # Calculate and store F1-score
-        f1 = f1_score(y_true, y_pred, average='weighted')
-        evaluation_results['f1'] = f1
-
-        # # Calculate and store confusion matrix
-        # conf_matrix = confusion_matrix(y_true, y_pred)
-        # evaluation_results['confusion_matrix'] = conf_matrix
-
-        # Compute ROC curve and ROC area for each class
-        fpr, tpr, _ = roc_curve(y_true, y_pred_proba)
-        evaluation_results['fpr'] = fpr
-        evaluation_results['tpr'] = tpr
+        # Initialize the dictionary to store evaluation results
+        evaluation_results = {name: float(metrics[name][0]) for name in ('accuracy', 'precision', 'recall', 'f1')}
 
-        roc_auc = auc(fpr, tpr)
-        evaluation_results['auc'] = roc_auc
+        evaluation_results['auc'] = float(metrics['auc'][0])
 
         # Calibration metric
-        brier_score = brier_score_loss(y_true, y_pred_proba)
-        evaluation_results['brier_score'] = brier_score
+        evaluation_results['brier_score'] = float(metrics['brier_score'][0])
 
         return evaluation_results
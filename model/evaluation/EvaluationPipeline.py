@@ -1,5 +1,4 @@
-from model.evaluation.BootstrapPoint632 import BootstrapPoint632
-from model.evaluation.TrainTest import TrainTest
+import registry
 
 
 class EvaluationPipeline:
@@ -28,8 +27,8 @@ class EvaluationPipeline:
         """
 
         if self.parameters['evaluation_technique'] == 'train_test':
-            evaluation = TrainTest(self.parameters, self.model)
+            evaluation = registry.load('evaluation_technique', 'train_test')(self.parameters, self.model)
             return evaluation.evaluate()
         elif self.parameters['evaluation_technique'] == '.632+':
-            evaluation = BootstrapPoint632(self.parameters)
+            evaluation = registry.load('evaluation_technique', '.632+')(self.parameters)
             return evaluation.evaluate()
@@ -0,0 +1,123 @@
+from collections import OrderedDict
+
+import numpy as np
+
+from model.evaluation.QuantileSketch import QuantileSketch
+
+
+class FeatureImportanceAggregator:
+    """
+    Aggregates the feature importances of many runs as they finish. The mean and standard deviation are updated with
+    Welford's algorithm and the 95% interval either comes from quantile sketches, exact up to a few thousand runs and
+    streaming in constant memory beyond them, or, without them, from the normal approximation.
+    """
+
+    def __init__(self, feature_names, quantiles=True):
+        """
+        Initialize a new instance of FeatureImportanceAggregator
+
+        Args:
+            feature_names (list): names of the features, in the order of the importance vectors.
+            quantiles (bool): whether the interval is estimated with quantile sketches instead of the normal
+                approximation.
+        """
+        self.feature_names = list(feature_names)
+        self.count = 0
+        self.means = np.zeros(len(self.feature_names))
+        self.squared_deviations = np.zeros(len(self.feature_names))
+
+        if quantiles:
+            self.sketches = [QuantileSketch(0.025, len(self.feature_names)),
+                             QuantileSketch(0.975, len(self.feature_names))]
+        else:
+            self.sketches = None
+
+    def update(self, feature_importances):
+        """
+        Adds the feature importances of a run. Runs of models without feature importances are ignored.
+
+        Args:
+            feature_importances (dict or array): importances keyed by feature name, or ordered as feature_names.
+        """
+        if feature_importances is None or len(feature_importances) == 0:
+            return
+
+        if isinstance(feature_importances, dict):
+            feature_importances = [feature_importances[feature] for feature in self.feature_names]
+        values = np.asarray(feature_importances, dtype=float)
+
+        self.count += 1
+        deltas = values - self.means
+        self.means += deltas / self.count
+        self.squared_deviations += deltas * (values - self.means)
+
+        if self.sketches is not None:
+            for sketch in self.sketches:
+                sketch.update(values)
+
+    def std(self):
+        """
+        Retrieves the sample standard deviation of the importance of every feature.
+
+        Returns:
+            The array of standard deviations, zero with less than two runs.
+        """
+        if self.count < 2:
+            return np.zeros(len(self.feature_names))
+
+        return np.sqrt(self.squared_deviations / (self.count - 1))
+
+    def interval(self):
+        """
+        Retrieves the 95% interval of the importance of every feature.
+
+        Returns:
+            A tuple with the arrays of lower and upper bounds.
+        """
+        if self.sketches is not None:
+            return self.sketches[0].result(), self.sketches[1].result()
+
+        std = self.std()
+        return self.means - 1.96 * std, self.means + 1.96 * std
+
+    def mean_importances(self, decimals=3):
+        """
+        Retrieves the mean importance of every feature.
+
+        Args:
+            decimals (int): number of decimals of the values.
+
+        Returns:
+            An ordered dictionary from feature name to mean importance sorted in descending order, empty if no run had
+            feature importances.
+        """
+        if self.count == 0:
+            return OrderedDict()
+
+        rounded_feature_importances = {feature: round(float(value), decimals) for feature, value in
+                                       zip(self.feature_names, self.means)}
+
+        # Sort the dictionary by values in descending order
+        return OrderedDict(sorted(rounded_feature_importances.items(), key=lambda x: x[1], reverse=True))
+
+    def summary(self, decimals=3):
+        """
+        Retrieves the mean, standard deviation and 95% interval of the importance of every feature.
+
+        Args:
+            decimals (int): number of decimals of the values.
+
+        Returns:
+            An ordered dictionary from feature name to a dictionary with the 'mean', 'std', 'lower' and 'upper' values,
+            sorted by mean importance in descending order.
+        """
+        if self.count == 0:
+            return OrderedDict()
+
+        std = self.std()
+        lower, upper = self.interval()
+        statistics = {feature: {'mean': round(float(self.means[i]), decimals), 'std': round(float(std[i]), decimals),
+                                'lower': round(float(lower[i]), decimals), 'upper': round(float(upper[i]), decimals)}
+                      for i, feature in enumerate(self.feature_names)}
+
+        return OrderedDict(sorted(statistics.items(), key=lambda x: x[1]['mean'], reverse=True))
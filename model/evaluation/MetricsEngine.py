@@ -0,0 +1,219 @@
+from functools import partial
+
+import numpy as np
+
+
+class MetricsEngine:
+    """
+    Computes the evaluation metrics of many runs at once. The predictions of every run are a row of a (runs x samples)
+    matrix, runs with fewer samples are padded and their padding gets a zero weight. The results match the weighted
+    average definitions of scikit-learn: accuracy, weighted precision, recall and F1, ROC AUC and Brier score loss.
+    """
+
+    metric_names = ['accuracy', 'precision', 'recall', 'f1', 'auc', 'brier_score']
+
+    def __init__(self, classes=None):
+        """
+        Initialize a new instance of MetricsEngine
+
+        Args:
+            classes (array): labels of the classes, sorted. The last one is the positive class of the AUC and the
+                Brier score. If None, they are taken from the labels of every batch.
+        """
+        self.classes = classes
+
+    @staticmethod
+    def stack(rows, fill_value=None):
+        """
+        Stacks the arrays of runs of different lengths into a matrix.
+
+        Args:
+            rows (list): list of 1-D arrays.
+            fill_value: value of the padding, the first value of the first row if None so no new label is introduced.
+
+        Returns:
+            A tuple with the (runs x samples) matrix and the weights, which are 0 in the padding and 1 elsewhere.
+        """
+        rows = [np.asarray(row) for row in rows]
+        if fill_value is None:
+            fill_value = rows[0][0] if len(rows) and len(rows[0]) else 0
+        lengths = np.array([len(row) for row in rows])
+        width = lengths.max() if len(rows) else 0
+        weights = (np.arange(width)[np.newaxis] < lengths[:, np.newaxis]).astype(float)
+
+        matrix = np.full((len(rows), width), fill_value, dtype=np.result_type(*rows) if len(rows) else float)
+        matrix[weights.astype(bool)] = np.concatenate(rows) if len(rows) else []
+
+        return matrix, weights
+
+    def compute(self, y_true, y_pred, y_pred_proba, sample_weight=None):
+        """
+        Computes all the metrics for a batch of runs.
+
+        Args:
+            y_true (array): true labels, (runs x samples).
+            y_pred (array): predicted labels, (runs x samples).
+            y_pred_proba (array): predicted probabilities of the positive class, (runs x samples).
+            sample_weight (array): weights of the samples, (runs x samples). If None all the samples weigh 1.
+
+        Returns:
+            A dictionary from metric name to the array with the value of every run.
+        """
+        y_true, y_pred, y_pred_proba, sample_weight = self.check_arrays(y_true, y_pred, y_pred_proba, sample_weight)
+        classes = self.get_classes(y_true, y_pred)
+
+        metrics = self.confusion_metrics(y_true, y_pred, sample_weight, classes)
+        metrics['auc'] = self.auc(y_true, y_pred_proba, sample_weight, classes)
+        metrics['brier_score'] = self.brier_score(y_true, y_pred_proba, sample_weight, classes)
+
+        return metrics
+
+    @staticmethod
+    def check_arrays(y_true, y_pred, y_score, sample_weight):
+        """
+        Converts the inputs to 2-D arrays, a single run can be given as 1-D arrays.
+
+        Returns:
+            The tuple of 2-D arrays, with the weights filled in.
+        """
+        y_true = np.atleast_2d(np.asarray(y_true))
+        y_pred = None if y_pred is None else np.atleast_2d(np.asarray(y_pred))
+        y_score = None if y_score is None else np.atleast_2d(np.asarray(y_score, dtype=float))
+
+        if sample_weight is None:
+            sample_weight = np.ones(y_true.shape)
+        else:
+            sample_weight = np.atleast_2d(np.asarray(sample_weight, dtype=float))
+
+        return y_true, y_pred, y_score, sample_weight
+
+    def get_classes(self, y_true, y_pred=None):
+        """
+        Retrieves the sorted labels of the classes.
+
+        Returns:
+            The array of labels.
+        """
+        if self.classes is not None:
+            return np.asarray(self.classes)
+
+        if y_pred is None:
+            return np.unique(y_true)
+
+        return np.union1d(np.unique(y_true), np.unique(y_pred))
+
+    def confusion_metrics(self, y_true, y_pred, sample_weight, classes):
+        """
+        Computes the metrics derived from the confusion matrix of every run. Precision, recall and F1 are averaged
+        over the classes weighted by their support, classes never predicted have a precision of 0.
+
+        Returns:
+            A dictionary with the arrays of accuracy, precision, recall and F1.
+        """
+        total = sample_weight.sum(axis=1)
+        correct = ((y_true == y_pred) * sample_weight).sum(axis=1)
+
+        precision = np.zeros(y_true.shape[0])
+        recall = np.zeros(y_true.shape[0])
+        f1 = np.zeros(y_true.shape[0])
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            for label in classes:
+                is_true = (y_true == label) * sample_weight
+                is_predicted = (y_pred == label) * sample_weight
+                true_positives = (is_true * (y_pred == label)).sum(axis=1)
+                support = is_true.sum(axis=1)
+                predicted = is_predicted.sum(axis=1)
+
+                class_precision = np.where(predicted > 0, true_positives / predicted, 0.0)
+                class_recall = np.where(support > 0, true_positives / support, 0.0)
+                class_f1 = np.where(class_precision + class_recall > 0,
+                                    2 * class_precision * class_recall / (class_precision + class_recall), 0.0)
+
+                precision += class_precision * support
+                recall += class_recall * support
+                f1 += class_f1 * support
+
+            return {'accuracy': correct / total, 'precision': precision / total, 'recall': recall / total,
+                    'f1': f1 / total}
+
+    def auc(self, y_true, y_score, sample_weight, classes):
+        """
+        Computes the area under the ROC curve of every run as the weighted probability that a positive sample scores
+        higher than a negative one, counting ties as one half.
+
+        Returns:
+            The array of AUC values, NaN for runs with a single class.
+        """
+        positive = (y_true == classes[-1])
+        order = np.argsort(y_score, axis=1, kind='mergesort')
+        scores = np.take_along_axis(y_score, order, axis=1)
+        positive_weights = np.take_along_axis(positive * sample_weight, order, axis=1)
+        negative_weights = np.take_along_axis(~positive * sample_weight, order, axis=1)
+
+        # First and last position of the group of tied scores of every sample
+        n_samples = scores.shape[1]
+        positions = np.broadcast_to(np.arange(n_samples), scores.shape)
+        new_group = np.ones(scores.shape, dtype=bool)
+        new_group[:, 1:] = scores[:, 1:] != scores[:, :-1]
+        group_start = np.maximum.accumulate(np.where(new_group, positions, 0), axis=1)
+        end_group = np.ones(scores.shape, dtype=bool)
+        end_group[:, :-1] = new_group[:, 1:]
+        group_end = np.minimum.accumulate(np.where(end_group, positions, n_samples - 1)[:, ::-1], axis=1)[:, ::-1]
+
+        negatives_up_to = np.cumsum(negative_weights, axis=1)
+        negatives_below = np.take_along_axis(negatives_up_to - negative_weights, group_start, axis=1)
+        negatives_tied = np.take_along_axis(negatives_up_to, group_end, axis=1) - negatives_below
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            return (positive_weights * (negatives_below + 0.5 * negatives_tied)).sum(axis=1) / \
+                (positive_weights.sum(axis=1) * negative_weights.sum(axis=1))
+
+    def brier_score(self, y_true, y_score, sample_weight, classes):
+        """
+        Computes the Brier score loss of every run, the weighted mean squared difference between the probability of
+        the positive class and the outcome.
+
+        Returns:
+            The array of Brier scores.
+        """
+        outcome = (y_true == classes[-1]).astype(float)
+
+        return ((outcome - y_score) ** 2 * sample_weight).sum(axis=1) / sample_weight.sum(axis=1)
+
+    def score(self, metric, y_true, y_pred, sample_weight=None):
+        """
+        Computes a single metric for a single run, with the signature of the scikit-learn metrics.
+
+        Args:
+            metric (string): name of the metric.
+            y_true (array): true labels.
+            y_pred (array): predicted labels, or probabilities of the positive class for the AUC and Brier score.
+            sample_weight (array): weights of the samples.
+
+        Returns:
+            The value of the metric.
+        """
+        if metric in ('auc', 'brier_score'):
+            y_true, _, y_score, sample_weight = self.check_arrays(y_true, None, y_pred, sample_weight)
+            classes = self.get_classes(y_true)
+            if metric == 'auc':
+                if len(np.unique(y_true)) < 2:
+                    raise ValueError("Only one class present in y_true. ROC AUC score is not defined in that case.")
+                return float(self.auc(y_true, y_score, sample_weight, classes)[0])
+            return float(self.brier_score(y_true, y_score, sample_weight, classes)[0])
+
+        y_true, y_pred, _, sample_weight = self.check_arrays(y_true, y_pred, None, sample_weight)
+        return float(self.confusion_metrics(y_true, y_pred, sample_weight, self.get_classes(y_true, y_pred))[metric][0])
+
+    def scorer(self, metric):
+        """
+        Retrieves a scoring function for a single metric.
+
+        Args:
+            metric (string): name of the metric.
+
+        Returns:
+            A function with the signature scorer(y_true, y_pred, sample_weight=None).
+        """
+        return partial(self.score, metric)
@@ -0,0 +1,123 @@
+import numpy as np
+
+
+class QuantileSketch:
+    """
+    Quantile of many streams at once, for example one per feature or one per point of a curve. The observations are
+    kept and the quantile is exact up to a number of them, beyond which the streaming estimate of the P-square
+    algorithm (Jain and Chlamtac, 1985) takes over, keeping five markers per stream instead of the observations.
+    """
+
+    # Number of markers of the P-square algorithm
+    n_markers = 5
+
+    def __init__(self, quantile, shape, exact_limit=2000):
+        """
+        Initialize a new instance of QuantileSketch
+
+        Args:
+            quantile (float): quantile to be estimated, between 0 and 1.
+            shape (int or tuple): shape of the observations, every position is an independent stream.
+            exact_limit (int): number of observations kept for the exact quantile, P-square is only used beyond it,
+                as its estimate is biased with few observations.
+        """
+        self.quantile = quantile
+        self.shape = shape if isinstance(shape, tuple) else (shape,)
+        self.exact_limit = max(exact_limit, self.n_markers)
+        self.count = 0
+
+        # The markers are placed once the kept observations exceed the limit
+        self.observations = []
+        self.heights = None
+        self.positions = None
+        self.desired_positions = None
+        self.increments = np.array([0, quantile / 2, quantile, (1 + quantile) / 2, 1])
+
+    def start_markers(self):
+        """
+        Places the markers of the P-square algorithm on the order statistics of the kept observations, which are then
+        released.
+        """
+        observations = np.sort(np.stack(self.observations), axis=0)
+        self.observations = None
+
+        # Markers at the ranks closest to their desired positions, always one rank apart at least
+        self.desired_positions = 1 + (self.count - 1) * self.increments
+        ranks = []
+        for i, desired in enumerate(self.desired_positions):
+            lowest = ranks[-1] + 1 if ranks else 1
+            highest = self.count - (self.n_markers - 1 - i)
+            ranks.append(int(min(max(round(desired), lowest), highest)))
+
+        self.heights = observations[np.array(ranks) - 1]
+        markers = np.array(ranks, dtype=float).reshape((self.n_markers,) + (1,) * len(self.shape))
+        self.positions = np.broadcast_to(markers, self.heights.shape).copy()
+
+    def update(self, values):
+        """
+        Adds an observation to every stream.
+
+        Args:
+            values (array): observation, with the shape of the sketch.
+        """
+        values = np.asarray(values, dtype=float)
+
+        if self.observations is not None:
+            self.observations.append(values.copy())
+            self.count += 1
+            if self.count > self.exact_limit:
+                self.start_markers()
+            return
+
+        self.count += 1
+        heights = self.heights
+        positions = self.positions
+
+        # Cell of every observation, the extreme markers are moved when the observation falls outside of them
+        heights[0] = np.minimum(heights[0], values)
+        heights[-1] = np.maximum(heights[-1], values)
+        cell = np.clip((values[np.newaxis] >= heights[1:-1]).sum(axis=0), 0, self.n_markers - 2)
+
+        markers = np.arange(self.n_markers).reshape((self.n_markers,) + (1,) * values.ndim)
+        positions += markers > cell[np.newaxis]
+        self.desired_positions = self.desired_positions + self.increments
+
+        # Adjust the heights of the middle markers that drifted from their desired positions
+        for i in range(1, self.n_markers - 1):
+            drift = self.desired_positions[i] - positions[i]
+            move = ((drift >= 1) & (positions[i + 1] - positions[i] > 1)) | \
+                   ((drift <= -1) & (positions[i - 1] - positions[i] < -1))
+            if not move.any():
+                continue
+
+            step = np.where(move, np.sign(drift), 0)
+
+            with np.errstate(divide='ignore', invalid='ignore'):
+                parabolic = heights[i] + step / (positions[i + 1] - positions[i - 1]) * (
+                    (positions[i] - positions[i - 1] + step) * (heights[i + 1] - heights[i]) /
+                    (positions[i + 1] - positions[i]) +
+                    (positions[i + 1] - positions[i] - step) * (heights[i] - heights[i - 1]) /
+                    (positions[i] - positions[i - 1]))
+                neighbour_heights = np.where(step > 0, heights[i + 1], heights[i - 1])
+                neighbour_positions = np.where(step > 0, positions[i + 1], positions[i - 1])
+                linear = heights[i] + step * (neighbour_heights - heights[i]) / (neighbour_positions - positions[i])
+
+            # The linear formula is used when the parabolic one would break the order of the markers
+            parabolic_valid = (heights[i - 1] < parabolic) & (parabolic < heights[i + 1])
+            heights[i] = np.where(move, np.where(parabolic_valid, parabolic, linear), heights[i])
+            positions[i] += step
+
+    def result(self):
+        """
+        Retrieves the current estimate of the quantile of every stream.
+
+        Returns:
+            The array of estimates, with the shape of the sketch, or NaN if there are no observations.
+        """
+        if self.count == 0:
+            return np.full(self.shape, np.nan)
+
+        if self.observations is not None:
+            return np.quantile(np.stack(self.observations), self.quantile, axis=0)
+
+        return self.heights[2].copy()
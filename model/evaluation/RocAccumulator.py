@@ -0,0 +1,139 @@
+import numpy as np
+import pandas as pd
+
+from model.evaluation.QuantileSketch import QuantileSketch
+
+
+class RocAccumulator:
+    """
+    Accumulates the ROC curves of many runs on a fixed grid of false positive rates. Every curve is interpolated onto
+    the grid as soon as its run finishes, and only the running mean and variance of the true positive rates and two
+    quantile sketches for the 95% band are kept. The band is exact up to a few thousand runs, beyond which the
+    sketches stream in constant memory, so memory never depends on the number of test samples.
+    """
+
+    def __init__(self, n_points=100, keep_curves=False):
+        """
+        Initialize a new instance of RocAccumulator
+
+        Args:
+            n_points (int): number of points of the false positive rate grid, between 0 and 1.
+            keep_curves (bool): whether the interpolated curve of every run is kept, to plot the individual runs.
+        """
+        self.fpr = np.linspace(0, 1, n_points)
+        self.count = 0
+        self.mean_tpr = np.zeros(n_points)
+        self.squared_deviations = np.zeros(n_points)
+        self.sketches = [QuantileSketch(0.025, n_points), QuantileSketch(0.975, n_points)]
+        self.curves = [] if keep_curves else None
+
+    def update(self, y_true, y_score, pos_label=1):
+        """
+        Adds the ROC curve of a run. Runs with a single class have no ROC curve and are ignored.
+
+        Args:
+            y_true (array): true labels of the run.
+            y_score (array): predicted probabilities of the positive class.
+            pos_label: label of the positive class.
+        """
+        tpr = self.interpolate(*self.roc_curve(y_true, y_score, pos_label))
+        if tpr is None:
+            return
+
+        self.count += 1
+        deltas = tpr - self.mean_tpr
+        self.mean_tpr += deltas / self.count
+        self.squared_deviations += deltas * (tpr - self.mean_tpr)
+
+        for sketch in self.sketches:
+            sketch.update(tpr)
+
+        if self.curves is not None:
+            self.curves.append(tpr)
+
+    @staticmethod
+    def roc_curve(y_true, y_score, pos_label=1):
+        """
+        Computes the points of the ROC curve at every distinct threshold.
+
+        Returns:
+            A tuple with the arrays of false and true positive rates, or (None, None) if there is a single class.
+        """
+        y_score = np.asarray(y_score, dtype=float)
+        positive = np.asarray(y_true) == pos_label
+
+        order = np.argsort(-y_score, kind='mergesort')
+        y_score = y_score[order]
+        positive = positive[order]
+
+        # Only the last sample of every group of tied scores is a point of the curve
+        distinct = np.r_[y_score[1:] != y_score[:-1], True]
+        true_positives = np.cumsum(positive)[distinct]
+        false_positives = np.cumsum(~positive)[distinct]
+
+        if true_positives[-1] == 0 or false_positives[-1] == 0:
+            return None, None
+
+        return np.r_[0, false_positives / false_positives[-1]], np.r_[0, true_positives / true_positives[-1]]
+
+    def interpolate(self, fpr, tpr):
+        """
+        Interpolates a ROC curve linearly onto the false positive rate grid. On vertical segments the highest true
+        positive rate is taken.
+
+        Returns:
+            The array of true positive rates on the grid, or None if there is no curve.
+        """
+        if fpr is None:
+            return None
+
+        # Last point of the curve at or before every point of the grid, and the next one
+        left = np.searchsorted(fpr, self.fpr, side='right') - 1
+        right = np.minimum(left + 1, len(fpr) - 1)
+
+        with np.errstate(divide='ignore', invalid='ignore'):
+            slope = np.where(fpr[right] > fpr[left], (tpr[right] - tpr[left]) / (fpr[right] - fpr[left]), 0.0)
+
+        return tpr[left] + slope * (self.fpr - fpr[left])
+
+    def std_tpr(self):
+        """
+        Retrieves the standard deviation of the true positive rate at every point of the grid.
+
+        Returns:
+            The array of standard deviations, zero with less than two runs.
+        """
+        if self.count < 2:
+            return np.zeros(len(self.fpr))
+
+        return np.sqrt(self.squared_deviations / (self.count - 1))
+
+    def band(self):
+        """
+        Retrieves the 95% band of the true positive rate at every point of the grid.
+
+        Returns:
+            A tuple with the arrays of lower and upper bounds.
+        """
+        return self.sketches[0].result(), self.sketches[1].result()
+
+    def to_dataframe(self):
+        """
+        Retrieves the mean ROC curve and its band.
+
+        Returns:
+            A dataframe with the false positive rate and the mean, standard deviation and 95% band of the true
+            positive rate.
+        """
+        lower, upper = self.band()
+        return pd.DataFrame({'fpr': self.fpr, 'mean_tpr': self.mean_tpr, 'std_tpr': self.std_tpr(),
+                             'lower_tpr': lower, 'upper_tpr': upper})
+
+    def export_csv(self, path):
+        """
+        Saves the mean ROC curve and its band as a csv file.
+
+        Args:
+            path (string): path of the csv file.
+        """
+        self.to_dataframe().to_csv(path, index=False, float_format='%.4f')
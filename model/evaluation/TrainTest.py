@@ -1,8 +1,60 @@
-import random
+import itertools
+
 from sklearn.model_selection import train_test_split
 from model.evaluation.EvaluateModel import EvaluateModel
-from collections import OrderedDict
-import pandas as pd
+from model.evaluation.FeatureImportanceAggregator import FeatureImportanceAggregator
+from model.evaluation.MetricsEngine import MetricsEngine
+from model.evaluation.RocAccumulator import RocAccumulator
+from model.models.KernelCache import KernelCache
+import numpy as np
+from joblib import Parallel, delayed
+
+import resources
+import tracing
+
+
+def evaluate_split(X, y, run, seed, test_size, model_type, params, feature_names, threads=None, kernel_cache=None):
+    """
+    Fits the model over a random train/test split of the data and predicts its test part. With a kernel cache the SVM
+    is fitted and predicts with the rows and columns of the split in the kernel of all the samples.
+
+    Args:
+        X (array): features of the whole dataset.
+        y (array): target of the whole dataset.
+        run (int): number of the split.
+        seed (int): seed of the split.
+        test_size (float): fraction of the samples used for testing.
+        model_type (string): model to be instantiated.
+        params (dictionary): dictionary containing the optimized hyperparameters of the model.
+        feature_names (list): names of the features.
+        threads (int): threads of the estimator, its default if None.
+        kernel_cache (KernelCache): distances between the samples of X, None fits the model on the samples.
+
+    Returns:
+        A tuple with the true labels, the predicted labels and the predicted probabilities of the test part, and the
+        dictionary containing the feature importances.
+    """
+    evaluator = EvaluateModel()
+
+    with tracing.span('evaluation/split', run=run):
+        if kernel_cache is None:
+            X_train, X_test, y_train, y_test = train_test_split(X, y, test_size=test_size, random_state=seed)
+        else:
+            # Splitting the indices gives the same split as splitting the data
+            train, test = train_test_split(np.arange(len(y)), test_size=test_size, random_state=seed)
+            matrix = kernel_cache.kernel(params.get('gamma', 'scale'), train)
+            X_train, X_test = KernelCache.split(matrix, train, train), KernelCache.split(matrix, test, train)
+            y_train, y_test = y[train], y[test]
+
+        model, feature_importances = evaluator.instantiate_model(X_train, y_train, model_type, params,
+                                                                 feature_names=feature_names, threads=threads,
+                                                                 precomputed=kernel_cache is not None,
+                                                                 random_state=seed)
+        y_pred = model.predict(X_test)
+        y_pred_proba = model.predict_proba(X_test)[:, 1]
+
+    return y_test, y_pred, y_pred_proba, feature_importances
+
 
 class TrainTest(EvaluateModel):
     def __init__(self, parameters, model):
@@ -22,7 +74,9 @@ class TrainTest(EvaluateModel):
 
     def evaluate(self):
         """
-        Performs evaluation following the train/test technique.
+        Performs evaluation following the train/test technique. The splits are run over a pool of n_jobs processes,
+        which share the CPUs of the combination with the threads of their estimators, and every split gets its own seed
+        derived from the seed of the combination.
 
         Returns:
             The dictionary containing all the evaluation metrics.
@@ -30,53 +84,50 @@ class TrainTest(EvaluateModel):
         y_pred = self.model.predict(self.X)
         y_pred_proba = self.model.predict_proba(self.X)[:, 1]
 
-        metrics = self.compute_metrics(y_true=self.y, y_pred=y_pred, y_pred_proba=y_pred_proba)
-
-        metrics_df = pd.DataFrame([metrics])
-
-        feature_importances_df = pd.DataFrame()
-
-        seeds = [random.randint(1, 99999) for _ in range(self.runs)]
-        for seed in seeds:
-            X_train, X_test, y_train, y_test = train_test_split(
-                self.parameters['dataframe'].drop(self.parameters['target'], axis=1),
-                self.parameters['dataframe'][self.parameters['target']],
-                test_size=self.parameters['test_size'], random_state=seed)
-
-            model, feature_importances = self.instantiate_model(X_train, y_train, self.parameters['model'], self.parameters['best_params'])
-            y_pred = model.predict(X_test)
-            y_pred_proba = model.predict_proba(X_test)[:, 1]
-
-            metrics = self.compute_metrics(y_true=y_test, y_pred=y_pred, y_pred_proba=y_pred_proba)
-
-            new_row = pd.DataFrame([metrics])
-
-            feature_importances_df = pd.concat([feature_importances_df, pd.DataFrame([feature_importances])], axis=0)
-            # Append the new row to the original DataFrame
-            metrics_df = pd.concat([metrics_df, new_row], axis=0)
-
-        roc_curves_df = metrics_df[['fpr', 'tpr']]
-
-        # Calculate the average of each column
-        average_values = metrics_df.drop(['fpr', 'tpr'], axis=1).mean()
-
-        average_feature_importances = feature_importances_df.mean()
-
-        # Convert the Series with average values to a dictionary
-        average_dict = average_values.to_dict()
-
-        average_feature_importances = average_feature_importances.to_dict()
-
-        # Round the values to 3 decimals and convert to float
-        rounded_feature_importances = {key: round(float(value), 3) for key, value in
-                                       average_feature_importances.items()}
-
-        # Sort the dictionary by values in descending order
-        sorted_feature_importances = OrderedDict(
-            sorted(rounded_feature_importances.items(), key=lambda x: x[1], reverse=True))
-
-        self.parameters['feature_importances'] = sorted_feature_importances
-
-        self.plot_roc(roc_curves_df, average_dict['auc'])
+        # The data is converted once and shared by all the splits
+        X = self.parameters['dataframe'].drop(self.parameters['target'], axis=1)
+        feature_names = X.columns.tolist()
+        X = X.to_numpy()
+        y = self.parameters['dataframe'][self.parameters['target']].to_numpy()
+
+        # The distances between the samples are computed once for all the splits of the SVM
+        kernel_cache = self.get_kernel_cache(X) if self.parameters['model'] == 'rbf_svm' else None
+
+        # The seeds only depend on the seed of the combination, not on the order in which the splits are run
+        seeds = [int(child.generate_state(1)[0])
+                 for child in np.random.SeedSequence(self.parameters['seed']).spawn(self.runs)]
+
+        # Every run is added to the metrics and the ROC curves as soon as it finishes and its predictions are dropped,
+        # so memory does not grow with the number of runs. The first run is the test set.
+        metrics_engine = MetricsEngine(classes=np.unique(np.concatenate([y, np.asarray(self.y)])))
+        run_metrics = {name: [] for name in MetricsEngine.metric_names}
+        roc_accumulator = RocAccumulator(keep_curves=not self.parameters['plot_mean_roc'])
+        positive_label = np.unique(y)[-1]
+        importances = FeatureImportanceAggregator(feature_names)
+
+        n_jobs, threads = resources.allocate(self.parameters.get('n_jobs') or 1, n_tasks=self.runs)
+        with resources.limits(threads):
+            results = Parallel(n_jobs=n_jobs, return_as='generator')(
+                delayed(tracing.task(evaluate_split))(X, y, run, seed, self.parameters['test_size'],
+                                                      self.parameters['model'], self.parameters['best_params'],
+                                                      feature_names, threads, kernel_cache)
+                for run, seed in enumerate(seeds))
+
+            for y_test, run_pred, run_pred_proba, feature_importances in itertools.chain(
+                    [(np.asarray(self.y), np.asarray(y_pred), y_pred_proba, None)], results):
+                metrics = metrics_engine.compute(np.asarray(y_test)[np.newaxis], np.asarray(run_pred)[np.newaxis],
+                                                 np.asarray(run_pred_proba)[np.newaxis])
+                for name in MetricsEngine.metric_names:
+                    run_metrics[name].append(float(metrics[name][0]))
+                roc_accumulator.update(y_test, run_pred_proba, pos_label=positive_label)
+                importances.update(feature_importances)
+
+        # Calculate the average of each metric
+        average_dict = {name: float(np.mean(values)) for name, values in run_metrics.items()}
+
+        self.store_feature_importances(importances)
+
+        self.plot_roc(roc_accumulator, average_dict['auc'])
+        roc_accumulator.export_csv(self.parameters['output_path'] + self.parameters['model'] + '_roc.csv')
 
         return average_dict
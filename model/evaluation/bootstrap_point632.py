@@ -5,14 +5,16 @@
 # Author: Sebastian Raschka <sebastianraschka.com>
 #
 # License: BSD 3 clause
-from collections import OrderedDict
-from itertools import product
+import inspect
 
 import numpy as np
-import pandas as pd
-from mlxtend.evaluate import BootstrapOutOfBag
+from joblib import Parallel, delayed
 from sklearn.base import clone
+from sklearn.metrics import accuracy_score, roc_auc_score
 from model.evaluation import EvaluateModel
+from model.evaluation.FeatureImportanceAggregator import FeatureImportanceAggregator
+from model.models.KernelCache import KernelCache
+import tracing
 
 
 def _check_arrays(X, y=None):
@@ -31,9 +33,63 @@ def _check_arrays(X, y=None):
         raise ValueError("X and y must contain the" "same number of samples")
 
 
+def _accepts_sample_weight(loss_fn):
+    try:
+        return "sample_weight" in inspect.signature(loss_fn).parameters
+    except (TypeError, ValueError):
+        return False
+
+
 def no_information_rate(targets, predictions, loss_fn):
-    combinations = np.array(list(product(targets, predictions)))
-    return loss_fn(combinations[:, 0], combinations[:, 1])
+    """
+    Score of the predictions over every (target, prediction) pair, the
+    rate expected when the predictions carry no information about the
+    targets.
+
+    Accuracy, mean squared error and ROC AUC are computed from the class
+    and prediction frequencies. Scoring functions accepting sample_weight
+    are evaluated once per distinct pair, weighted by its frequency, and
+    any other scoring function over the n^2 pairs.
+    """
+    targets = np.asarray(targets)
+    predictions = np.asarray(predictions)
+
+    if loss_fn is accuracy or loss_fn is accuracy_score:
+        target_classes, target_counts = np.unique(targets, return_counts=True)
+        prediction_classes, prediction_counts = np.unique(predictions, return_counts=True)
+        _, target_index, prediction_index = np.intersect1d(
+            target_classes, prediction_classes, assume_unique=True, return_indices=True
+        )
+        matches = np.dot(target_counts[target_index], prediction_counts[prediction_index])
+        return matches / (targets.shape[0] * predictions.shape[0])
+
+    if loss_fn is mse:
+        return (
+            np.mean(targets ** 2)
+            - 2 * np.mean(targets) * np.mean(predictions)
+            + np.mean(predictions ** 2)
+        )
+
+    if loss_fn is roc_auc_score and predictions.ndim == 1 and np.unique(targets).shape[0] == 2:
+        # Both classes are paired with the same predictions, so their
+        # score distributions are identical
+        return 0.5
+
+    if predictions.ndim == 1 and _accepts_sample_weight(loss_fn):
+        # Every distinct (target, prediction) pair is scored once,
+        # weighted by the number of times it appears among the n^2 pairs
+        target_values, target_counts = np.unique(targets, return_counts=True)
+        prediction_values, prediction_counts = np.unique(predictions, return_counts=True)
+        return loss_fn(
+            np.repeat(target_values, prediction_values.shape[0]),
+            np.tile(prediction_values, target_values.shape[0]),
+            sample_weight=np.outer(target_counts, prediction_counts).ravel(),
+        )
+
+    return loss_fn(
+        np.repeat(targets, predictions.shape[0]),
+        np.tile(predictions, targets.shape[0]),
+    )
 
 
 def accuracy(targets, predictions):
@@ -44,6 +100,148 @@ def mse(targets, predictions):
     return np.mean((np.array(targets) - np.array(predictions)) ** 2)
 
 
+def _bootstrap_split(n_samples, rng):
+    """Draws a bootstrap sample and its out-of-bag samples."""
+    train = rng.integers(0, n_samples, size=n_samples)
+    test = np.setdiff1d(np.arange(n_samples), train, assume_unique=True)
+    return train, test
+
+
+def _estimate(method, scoring_func, y, test, predicted_test_val, predicted_train_val):
+    """Computes the bootstrap estimate of a single scoring function."""
+    try:
+        test_acc = scoring_func(y[test], predicted_test_val)
+    except:
+        return np.nan
+
+    if method == "oob":
+        return test_acc
+
+    test_err = 1 - test_acc
+
+    # training error on the whole training set as mentioned in the
+    # comment of _score_replicate
+    train_err = 1 - scoring_func(y, predicted_train_val)
+
+    if method == ".632+":
+        gamma = 1 - (
+            no_information_rate(y, predicted_train_val, scoring_func)
+        )
+        # as in Efron and Tibshirani, the out-of-bag error is capped at the
+        # no-information error and the relative overfitting rate R stays in
+        # [0, 1], it is 0 when no overfitting can be measured
+        test_err = min(test_err, gamma)
+        if test_err > train_err and gamma > train_err:
+            R = (test_err - train_err) / (gamma - train_err)
+        else:
+            R = 0.0
+        weight = 0.632 / (1 - 0.368 * R)
+
+    else:
+        weight = 0.632
+
+    return 1 - (weight * test_err + (1.0 - weight) * train_err)
+
+
+def _score_replicate(
+    estimator,
+    X,
+    y,
+    replicate,
+    seed,
+    model_type,
+    feature_names,
+    method,
+    scorers,
+    proba_scorers,
+    fit_params,
+    kernel_cache=None,
+):
+    """
+    Fits a single bootstrap replicate once and scores it with every
+    scoring function.
+
+    Returns a dictionary with the score of every scoring function, NaN
+    where it can not be computed, and the feature importances as an
+    array ordered as feature_names, or None if the model does not
+    provide them.
+
+    With a kernel cache the estimator is an SVM fitted on the kernel of
+    its bootstrap sample, and it predicts with the kernel between the
+    samples and the bootstrap sample.
+    """
+    rng = np.random.default_rng(seed)
+    train, test = _bootstrap_split(X.shape[0], rng)
+
+    estimator = clone(estimator)
+    if estimator.get_params().get("random_state", 0) is None:
+        estimator.set_params(random_state=seed)
+
+    if kernel_cache is None:
+        X_train, X_test, X_all = X[train], X[test], X
+    else:
+        matrix = kernel_cache.kernel(estimator.get_params()["gamma"], train)
+        X_train = KernelCache.split(matrix, train, train)
+        X_test = KernelCache.split(matrix, test, train)
+        X_all = matrix[:, train]
+        estimator.set_params(kernel="precomputed")
+
+    # determine which prediction functions are needed
+    # either label, probability prediction or both
+    prediction_functions = {}
+    if any(name not in proba_scorers for name in scorers):
+        prediction_functions[False] = estimator.predict
+    if any(name in proba_scorers for name in scorers):
+        prediction_functions[True] = estimator.predict_proba
+
+    with tracing.span('evaluation/bootstrap_replicate', replicate=replicate):
+        estimator.fit(X_train, y[train], **fit_params)
+        feature_importances = EvaluateModel.get_feature_importances(estimator, model_type, feature_names)
+        if feature_importances:
+            feature_importances = np.array([feature_importances[feature] for feature in feature_names], dtype=float)
+        else:
+            feature_importances = None
+
+        predicted_test_vals = {}
+        predicted_train_vals = {}
+        for proba, predict_func in prediction_functions.items():
+            # get the prediction probability
+            # for binary class uses the last column
+            predicted_test_vals[proba] = predict_func(X_test)
+
+            if method in (".632", ".632+"):
+                # compute training error on the whole training set as reported in
+                # the original .632 boostrap paper
+                # in Eq (6.12) in
+                #    "Estimating the Error Rate of a Prediction Rule: Improvement
+                #     on Cross-Validation"
+                #     by B. Efron, 1983, https://doi.org/10.2307/2288636
+                # Also see the discussion at
+                #   https://github.com/rasbt/mlxtend/discussions/828
+                #
+                # This also applies to the .632+ estimate in the paper
+                #    "Improvements on Cross-Validation: The .632+ Bootstrap Method"
+                #    https://www.tandfonline.com/doi/abs/10.1080/01621459.1997.10474007
+                predicted_train_vals[proba] = predict_func(X_all)
+
+            if proba:
+                len_uniq = np.unique(y)
+
+                if len(len_uniq) == 2:
+                    predicted_test_vals[proba] = predicted_test_vals[proba][:, 1]
+                    if method in (".632", ".632+"):
+                        predicted_train_vals[proba] = predicted_train_vals[proba][:, 1]
+
+        # Every scoring function reuses the same predictions
+        scores = {}
+        for name, scoring_func in scorers.items():
+            proba = name in proba_scorers
+            scores[name] = _estimate(method, scoring_func, y, test, predicted_test_vals[proba],
+                                     predicted_train_vals.get(proba))
+
+    return scores, feature_importances
+
+
 def bootstrap_point632_score(
     estimator,
     X,
@@ -56,6 +254,12 @@ def bootstrap_point632_score(
     predict_proba=False,
     random_seed=None,
     clone_estimator=True,
+    n_jobs=1,
+    tolerance=None,
+    min_splits=100,
+    check_every=25,
+    monitor=None,
+    kernel_cache=None,
     **fit_params,
 ):
     """
@@ -98,14 +302,16 @@ def bootstrap_point632_score(
         - 3) 'oob' (regular out-of-bag, no weighting)
         for comparison studies.
 
-    scoring_func : callable,
+    scoring_func : callable or dict,
         Score function (or loss function) with signature
         ``scoring_func(y, y_pred, **kwargs)``.
         If none, uses classification accuracy if the
         estimator is a classifier and mean squared error
         if the estimator is a regressor.
+        A dictionary of names to score functions scores every
+        replicate with all of them, fitting it only once.
 
-    predict_proba : bool
+    predict_proba : bool or set
         Whether to use the `predict_proba` function for the
         `estimator` argument. This is to be used in conjunction
         with `scoring_func` which takes in probability values
@@ -113,6 +319,8 @@ def bootstrap_point632_score(
         For example, if the scoring_func is
         :meth:`sklearn.metrics.roc_auc_score`, then use
         `predict_proba=True`.
+        When `scoring_func` is a dictionary, the set of names of
+        the score functions that take probability values.
         Note that this requires `estimator` to have
         `predict_proba` method implemented.
 
@@ -124,6 +332,36 @@ def bootstrap_point632_score(
         Clones the estimator if true, otherwise fits
         the original.
 
+    n_jobs : int (default=1)
+        Number of processes used to run the bootstrap replicates.
+        The scores do not depend on it, as every replicate draws its
+        sample and seeds the estimator from its own seed.
+
+    tolerance : float (default=None)
+        If set, the replicates are run in batches of `check_every` and
+        the bootstrap stops once the Monte Carlo standard error of the
+        mean score of the `monitor` score function is at most
+        `tolerance`, after at least `min_splits` replicates.
+        `n_splits` is then the maximum number of replicates.
+
+    min_splits : int (default=100)
+        Minimum number of replicates before stopping early.
+
+    check_every : int (default=25)
+        Number of replicates between two checks of the standard error.
+        It does not depend on `n_jobs`, so the replicates used are the
+        same regardless of the number of workers.
+
+    monitor : str (default=None)
+        Name of the score function whose standard error is checked,
+        the first one if None.
+
+    kernel_cache : KernelCache (default=None)
+        Distances between the samples of X. If set, the estimator is
+        an SVM that is fitted and predicts with the RBF kernel built
+        from them, so the distances are not computed in every
+        replicate.
+
     fit_params : additional parameters
         Additional parameters to be passed to the .fit() function of the
         estimator when it is fit to the bootstrap samples.
@@ -133,7 +371,16 @@ def bootstrap_point632_score(
     -------
     scores : array of float, shape=(len(list(n_splits)),)
         Array of scores of the estimator for each bootstrap
-        replicate.
+        replicate, or a dictionary with the array of every score
+        function when `scoring_func` is a dictionary.
+
+    feature_importances : FeatureImportanceAggregator
+        Mean, standard deviation and 95% interval of the feature
+        importances over the replicates.
+
+    n_replicates : int
+        Number of replicates run, lower than `n_splits` when the
+        bootstrap stopped early.
 
     Examples
     --------
@@ -190,95 +437,82 @@ def bootstrap_point632_score(
                 "Estimator type undefined." "Please provide a scoring_func argument."
             )
 
-    # determine which prediction function to use
-    # either label, or probability prediction
-    if not predict_proba:
-        predict_func = cloned_est.predict
+    # A single scoring function is handled as a set with one scorer
+    multiple_scorers = isinstance(scoring_func, dict)
+    if multiple_scorers:
+        scorers = scoring_func
     else:
-        if not getattr(cloned_est, "predict_proba", None):
-            raise RuntimeError(
-                f"The estimator {cloned_est} does not "
-                f"support predicting probabilities via "
-                f"`predict_proba` function."
-            )
-        predict_func = cloned_est.predict_proba
-
-    oob = BootstrapOutOfBag(n_splits=n_splits, random_seed=random_seed)
-    scores = np.empty(dtype=float, shape=(n_splits,))
-    cnt = 0
-
-    feature_importances_df = pd.DataFrame()
-
-    for train, test in oob.split(X):
-        cloned_est.fit(X[train], y[train], **fit_params)
-        feature_importances = EvaluateModel.get_feature_importances(cloned_est, model_type, feature_names)
-        feature_importances_df = pd.concat([feature_importances_df, pd.DataFrame([feature_importances])], axis=0)
-        # get the prediction probability
-        # for binary class uses the last column
-        predicted_test_val = predict_func(X[test])
-
-        if method in (".632", ".632+"):
-            # predictions on the internal training set:
-            # predicted_train_val = predict_func(X[train])
-
-            # compute training error on the whole training set as reported in
-            # the original .632 boostrap paper
-            # in Eq (6.12) in
-            #    "Estimating the Error Rate of a Prediction Rule: Improvement
-            #     on Cross-Validation"
-            #     by B. Efron, 1983, https://doi.org/10.2307/2288636
-            # Also see the discussion at
-            #   https://github.com/rasbt/mlxtend/discussions/828
-            #
-            # This also applies to the .632+ estimate in the paper
-            #    "Improvements on Cross-Validation: The .632+ Bootstrap Method"
-            #    https://www.tandfonline.com/doi/abs/10.1080/01621459.1997.10474007
-            predicted_train_val = predict_func(X)
-
-        if predict_proba:
-            len_uniq = np.unique(y)
-
-            if len(len_uniq) == 2:
-                predicted_train_val = predicted_train_val[:, 1]
-                predicted_test_val = predicted_test_val[:, 1]
-
-        try:
-            test_acc = scoring_func(y[test], predicted_test_val)
-        except:
-            continue
-
-        if method == "oob":
-            acc = test_acc
+        scorers = {"score": scoring_func}
 
-        else:
-            test_err = 1 - test_acc
+    if isinstance(predict_proba, bool):
+        proba_scorers = set(scorers) if predict_proba else set()
+    else:
+        proba_scorers = set(predict_proba)
 
-            # training error on the whole training set as mentioned in the
-            # previous comment above
-            train_err = 1 - scoring_func(y, predicted_train_val)
+    if proba_scorers and not getattr(cloned_est, "predict_proba", None):
+        raise RuntimeError(
+            f"The estimator {cloned_est} does not "
+            f"support predicting probabilities via "
+            f"`predict_proba` function."
+        )
+
+    # Every replicate gets its own seed spawned from random_seed, so the
+    # bootstrap samples do not depend on the order in which the replicates
+    # are run nor on the number of workers
+    replicate_seeds = [
+        int(child.generate_state(1)[0])
+        for child in np.random.SeedSequence(random_seed).spawn(n_splits)
+    ]
+
+    scores = {name: np.full(n_splits, np.nan) for name in scorers}
+    importances = FeatureImportanceAggregator(feature_names)
 
-            if method == ".632+":
-                gamma = 1 - (
-                    no_information_rate(y, cloned_est.predict(X), scoring_func)
+    if monitor is None:
+        monitor = next(iter(scorers))
+
+    # Without a tolerance all the replicates form a single batch
+    if tolerance is None:
+        batch_size = n_splits
+    else:
+        batch_size = check_every
+    batches = [
+        range(start, min(start + batch_size, n_splits))
+        for start in range(0, n_splits, batch_size)
+    ]
+
+    n_replicates = 0
+    with Parallel(n_jobs=n_jobs) as parallel:
+        for batch in batches:
+            results = parallel(
+                delayed(tracing.task(_score_replicate))(
+                    cloned_est, X, y, replicate, replicate_seeds[replicate],
+                    model_type, feature_names, method, scorers, proba_scorers,
+                    fit_params, kernel_cache
                 )
-                R = (test_err - train_err) / (gamma - train_err)
-                weight = 0.632 / (1 - 0.368 * R)
+                for replicate in batch
+            )
 
-            else:
-                weight = 0.632
+            for replicate, (replicate_scores, replicate_importances) in zip(batch, results):
+                for name, score in replicate_scores.items():
+                    scores[name][replicate] = score
+                importances.update(replicate_importances)
+            n_replicates = batch[-1] + 1
 
-            acc = 1 - (weight * test_err + (1.0 - weight) * train_err)
+            if tolerance is not None and n_replicates >= min_splits:
+                monitored = scores[monitor][:n_replicates]
+                monitored = monitored[~np.isnan(monitored)]
+                if (
+                    len(monitored) > 1
+                    and np.std(monitored, ddof=1) / np.sqrt(len(monitored)) <= tolerance
+                ):
+                    break
 
-        scores[cnt] = acc
-        cnt += 1
+    scores = {name: values[:n_replicates] for name, values in scores.items()}
 
-    average_feature_importances = feature_importances_df.mean()
-    average_feature_importances = average_feature_importances.to_dict()
-    rounded_feature_importances = {key: round(float(value), 3) for key, value in
-                                   average_feature_importances.items()}
+    # Replicates whose score could not be computed are left out
+    scores = {name: values[~np.isnan(values)] for name, values in scores.items()}
 
-    # Sort the dictionary by values in descending order
-    sorted_feature_importances = OrderedDict(
-        sorted(rounded_feature_importances.items(), key=lambda x: x[1], reverse=True))
+    if not multiple_scorers:
+        scores = scores["score"]
 
-    return scores, sorted_feature_importances
+    return scores, importances, n_replicates
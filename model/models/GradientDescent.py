@@ -3,6 +3,9 @@ from sklearn.linear_model import SGDClassifier
 
 
 class GradientDescent(Model):
+    path_parameter = 'alpha'  # Regularization of the path-based training, weaker for lower values
+    path_ascending = False
+
     param_grid = {
         'loss': ['log_loss'],  # The loss function to be optimized
         'penalty': ['l2'],  # The regularization term to be applied ('l2', 'l1', or 'elasticnet')
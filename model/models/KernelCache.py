@@ -0,0 +1,96 @@
+import numpy as np
+from sklearn.metrics.pairwise import euclidean_distances
+
+
+class KernelCache:
+    """
+    Squared Euclidean distances between all the samples of a dataset, computed once, from which the RBF kernel of
+    every gamma is built by elementwise exponentiation. The SVM is then fitted with a precomputed kernel on the rows and
+    columns of its training samples, so tuning, train/test splits and bootstrap replicates never compute distances
+    again. The kernel of the last gamma is kept, as the candidates that share a gamma are evaluated together.
+
+    The matrices are stored as 'float64' or 'float32', which halves their memory at the cost of the precision of the
+    kernel. The joblib workers receive them as memory-mapped arrays instead of copies.
+    """
+
+    def __init__(self, X, dtype='float64'):
+        """
+        Initialize a new instance of KernelCache
+
+        Args:
+            X (dataframe or array): samples of the dataset.
+            dtype (string): precision of the stored matrices, 'float64' or 'float32'.
+        """
+        self.X = np.asarray(X, dtype=float)
+        self.distances = euclidean_distances(self.X, squared=True).astype(dtype, copy=False)
+        self.gamma = None
+        self.matrix = None
+
+    def resolve_gamma(self, gamma, rows=None):
+        """
+        Converts the gamma of the SVM to its value, computing 'scale' and 'auto' as the SVM does on its training data.
+
+        Args:
+            gamma (float or string): gamma of the SVM.
+            rows (array): indices of the training samples, all of them if None.
+
+        Returns:
+            The value of gamma.
+        """
+        if gamma == 'auto':
+            return 1.0 / self.X.shape[1]
+        if gamma == 'scale':
+            X = self.X if rows is None else self.X[rows]
+            variance = X.var()
+            return 1.0 / (self.X.shape[1] * variance) if variance != 0 else 1.0
+
+        return float(gamma)
+
+    def kernel(self, gamma, rows=None):
+        """
+        Retrieves the RBF kernel between all the samples, building it from the distances if gamma has changed.
+
+        Args:
+            gamma (float or string): gamma of the SVM.
+            rows (array): indices of the training samples, used to compute 'scale' and 'auto'.
+
+        Returns:
+            The kernel matrix.
+        """
+        gamma = self.resolve_gamma(gamma, rows)
+        if gamma != self.gamma:
+            # The previous kernel is released before the new one is allocated
+            self.matrix = None
+            self.matrix = np.multiply(self.distances, -gamma)
+            np.exp(self.matrix, out=self.matrix)
+            self.gamma = gamma
+
+        return self.matrix
+
+    def matches(self, X):
+        """
+        Checks whether the cache was built from the given samples.
+
+        Args:
+            X (dataframe or array): samples of the dataset.
+
+        Returns:
+            True if the samples are the ones of the cache.
+        """
+        X = np.asarray(X, dtype=float)
+        return X.shape == self.X.shape and np.array_equal(X, self.X)
+
+    @staticmethod
+    def split(matrix, rows, columns):
+        """
+        Retrieves the kernel between two sets of samples.
+
+        Args:
+            matrix (array): kernel between all the samples.
+            rows (array): indices of the samples to be fitted or predicted.
+            columns (array): indices of the training samples.
+
+        Returns:
+            The kernel matrix between the rows and the columns.
+        """
+        return matrix[np.ix_(rows, columns)]
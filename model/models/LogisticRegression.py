@@ -9,6 +9,8 @@ class LogisticRegression(Model):
     information for the training of this model.
     """
 
+    path_parameter = 'C'  # Regularization of the path-based training, weaker for higher values
+
     param_grid = {
         'C': [0.1, 0.75, 1, 10],  # Regularization parameter
         'penalty': ['l1'],  # Regularization type
@@ -31,6 +33,18 @@ class LogisticRegression(Model):
 
         Model.__init__(self, parameters, LogisticRegressionModel(random_state=self.parameters['seed']))
 
+    def supports_warm_start(self, setting):
+        """
+        Checks whether the solver continues from the previous coefficients, liblinear always starts from scratch.
+
+        Args:
+            setting (dict): hyperparameters other than the regularization.
+
+        Returns:
+            True if the points of a path can be fitted with warm starts.
+        """
+        return setting.get('solver', self.model.get_params()['solver']) != 'liblinear'
+
     def train(self):
         """
         Used for training the model, it just calls to the method in the superclass.
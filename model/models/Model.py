@@ -1,5 +1,60 @@
-from sklearn.model_selection import GridSearchCV
+import copy
+import csv
+import hashlib
+import os
+import time
+
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.experimental import enable_halving_search_cv  # noqa: F401
+from sklearn.metrics import get_scorer
+from sklearn.model_selection import GridSearchCV, HalvingGridSearchCV, ParameterGrid, StratifiedKFold
+from sklearn.utils import _safe_indexing
 import numpy as np
+import pandas as pd
+
+import resources
+import tracing
+from model.models.TPESearch import TPESearch
+
+
+def fit_path(estimator, setting, path_parameter, path, X, y, train, test):
+    """
+    Fits a linear model along its regularization path over one fold, each point starting from the coefficients of the
+    previous one, and scores every point on the validation part of the fold.
+
+    Args:
+        estimator (object): model to be fitted.
+        setting (dict): hyperparameters other than the regularization.
+        path_parameter (string): hyperparameter of the regularization.
+        path (list): values of the regularization, from the strongest to the weakest.
+        X (dataframe): training data.
+        y (array): target data.
+        train (array): indices of the training part of the fold.
+        test (array): indices of the validation part of the fold.
+
+    Returns:
+        The list of ROC AUC scores of every point of the path, NaN where the fit failed.
+    """
+    model = clone(estimator).set_params(**setting)
+    if 'warm_start' in model.get_params():
+        model.set_params(warm_start=True)
+
+    X_train, y_train = _safe_indexing(X, train), _safe_indexing(y, train)
+    X_test, y_test = _safe_indexing(X, test), _safe_indexing(y, test)
+    scorer = get_scorer('roc_auc')
+
+    scores = []
+    with tracing.span('train/path_fold', points=len(path)):
+        for value in path:
+            model.set_params(**{path_parameter: value})
+            try:
+                model.fit(X_train, y_train)
+                scores.append(scorer(model, X_test, y_test))
+            except ValueError:
+                scores.append(np.nan)
+
+    return scores
 
 
 class Model:
@@ -8,6 +63,14 @@ class Model:
     commonly used for training the models.
     """
 
+    # Hyperparameter that sets the regularization of the linear models, and whether its values go from the strongest
+    # to the weakest regularization in ascending order
+    path_parameter = None
+    path_ascending = True
+
+    # Hyperparameters set by the native cross validation of the models that have one, None for the rest of them
+    native_parameters = None
+
     def __init__(self, parameters, model):
         """
         Initialize a new instance of Model.
@@ -20,24 +83,80 @@ class Model:
         self.X = self.parameters['X_train']
         self.y = self.parameters['y_train']
         self.model = model
-        self.param_grid = self.parameters['parameters_grid']
+        # The grid is modified during the search, so combinations sharing the same grid do not affect each other
+        self.param_grid = copy.deepcopy(self.parameters['parameters_grid'])
         self.best_score = 0.0
         self.enable_grid_modification = self.parameters['enable_parameter_search']
+        self.search_round = 0
+        self.search_strategy = self.parameters.get('search_strategy') or 'grid'
+        # Only the linear models have a regularization path, the rest of them use the grid search
+        if self.search_strategy == 'path' and self.path_parameter is None:
+            self.search_strategy = 'grid'
+        # Same for the models without a native cross validation with early stopping
+        if self.search_strategy == 'early_stopping' and self.native_parameters is None:
+            self.search_strategy = 'grid'
+        self.resource = self.get_resource()
+
+        # Hyperparameters that are set by the search instead of taken from the grid
+        if self.search_strategy == 'early_stopping':
+            self.search_parameters = set(self.native_parameters)
+        else:
+            self.search_parameters = {self.resource} if self.resource else set()
+
+        # The folds are computed once, so every round is scored on the same plan and cached scores stay comparable
+        n_splits = min(15, np.min(np.bincount(self.y)))
+        self.folds = list(StratifiedKFold(n_splits).split(self.X, self.y))
+        digest = hashlib.sha256()
+        for _, test in self.folds:
+            digest.update(test.tobytes() + b'|')
+        self.fold_plan = digest.hexdigest()
+        self.score_cache = {}
+
+        # Timings and cache hits of every round, written to the output
+        self.search_rounds = []
+        self.parameters['search_rounds'] = self.search_rounds
 
     def train(self):
         """
         Method that recursively trains the model modifying the hyperparameters dynamically until the current
-        score do not improve the old one.
+        score do not improve the old one. The scores of every round are cached, so the refined grids only evaluate
+        the candidates that have not been scored yet and the search stops once a refined grid has nothing new.
 
         Returns:
             The trained grid search that contains the feature importances, best score, the best hyperparameters,
             among other important parameters.
         """
-        min_class_samples = np.min(np.bincount(self.y))
-        n_splits = min(15, min_class_samples)
+        if self.search_strategy == 'tpe':
+            return self.train_tpe()
+
+        self.search_round += 1
+        start = time.perf_counter()
+
+        candidates = list(ParameterGrid(self.get_search_grid()))
+        keys = [self.candidate_key(candidate) for candidate in candidates]
+
+        # Refined grids can repeat values, every candidate is only evaluated once
+        new_candidates = []
+        new_keys = set()
+        for candidate, key in zip(candidates, keys):
+            if key not in self.score_cache and key not in new_keys:
+                new_candidates.append(candidate)
+                new_keys.add(key)
+        cached = len(set(keys)) - len(new_candidates)
 
-        grid_search = GridSearchCV(self.model, self.param_grid, cv=n_splits, scoring='roc_auc', n_jobs=-1, verbose=1)
-        grid_search.fit(self.X, self.y)
+        # Every candidate of the refined grid was already scored, the search has converged
+        if not new_candidates:
+            return self.grid_search
+
+        with tracing.span('train/search_round', round=self.search_round, model=self.parameters['model'],
+                          cached=cached):
+            grid_search = self.fit_search([{parameter: [value] for parameter, value in candidate.items()}
+                                           for candidate in new_candidates])
+            self.cache_scores(grid_search)
+            self.select_best(grid_search, keys)
+
+        self.search_rounds.append({'round': self.search_round, 'candidates': len(set(keys)), 'cached': cached,
+                                   'seconds': round(time.perf_counter() - start, 2)})
 
         if not self.enable_grid_modification:
             return grid_search
@@ -53,6 +172,318 @@ class Model:
             self.modify_grid_params()
             return self.train()
 
+    def train_tpe(self):
+        """
+        Searches the hyperparameters with a Tree-structured Parzen Estimator, which replaces the grid refinement.
+        Every batch of proposals is cross validated in parallel and the search stops after the number of trials of
+        'search_trials' or once the seconds of 'search_time' have passed, whichever comes first, or when a whole batch
+        was already scored. Every trial is logged to a csv file in the output folder.
+
+        Returns:
+            The trained search with the best hyperparameters of all the trials.
+        """
+        tpe = TPESearch(self.param_grid, seed=self.parameters['seed'])
+        n_trials = self.parameters.get('search_trials') or 50
+        time_budget = self.parameters.get('search_time')
+        batch_size = self.parameters.get('search_batch_size') or 8
+
+        log_path = None
+        if self.parameters.get('output_path'):
+            log_path = self.parameters['output_path'] + self.parameters['model'] + '_tpe_trials.csv'
+            with open(log_path, 'w', newline='') as file:
+                csv.writer(file).writerow(['trial', 'round', 'score', 'cached'] + list(tpe.space))
+
+        start = time.perf_counter()
+        keys = []
+        grid_search = None
+        while len(keys) < n_trials and not (time_budget and time.perf_counter() - start >= time_budget):
+            self.search_round += 1
+            round_start = time.perf_counter()
+
+            trials = tpe.suggest(min(batch_size, n_trials - len(keys)))
+            trial_keys = [self.candidate_key(trial) for trial in trials]
+
+            # Proposals can repeat discrete values, every candidate is only evaluated once
+            new_candidates = []
+            new_keys = set()
+            for trial, key in zip(trials, trial_keys):
+                if key not in self.score_cache and key not in new_keys:
+                    new_candidates.append(trial)
+                    new_keys.add(key)
+
+            if new_candidates:
+                with tracing.span('train/search_round', round=self.search_round, model=self.parameters['model'],
+                                  cached=len(trials) - len(new_candidates)):
+                    grid_search = self.fit_search([{parameter: [value] for parameter, value in candidate.items()}
+                                                   for candidate in new_candidates])
+                    self.cache_scores(grid_search)
+
+            rows = []
+            for trial, key in zip(trials, trial_keys):
+                score = self.score_cache[key][0]
+                tpe.observe(trial, score)
+                rows.append([len(keys) + len(rows) + 1, self.search_round, round(float(score), 4), key not in new_keys]
+                            + [trial[parameter] for parameter in tpe.space])
+            keys += trial_keys
+
+            if log_path:
+                with open(log_path, 'a', newline='') as file:
+                    csv.writer(file).writerows(rows)
+
+            self.search_rounds.append({'round': self.search_round, 'candidates': len(trials),
+                                       'cached': len(trials) - len(new_candidates),
+                                       'seconds': round(time.perf_counter() - round_start, 2)})
+
+            # The proposals only repeat trials that were already scored, the search has converged
+            if not new_candidates:
+                break
+
+        self.select_best(grid_search, keys)
+        return grid_search
+
+    def candidate_key(self, candidate):
+        """
+        Builds the key of a candidate in the score cache, from its hyperparameters and the folds it is scored on.
+
+        Args:
+            candidate (dict): hyperparameters of the candidate, without the resource of the halving search.
+
+        Returns:
+            The key of the candidate.
+        """
+        return self.fold_plan, repr(sorted(candidate.items()))
+
+    def cache_scores(self, grid_search):
+        """
+        Stores the cross validation score of every candidate evaluated by a search. Only the last iteration of the
+        successive halving search is scored with the full resources, so the candidates discarded earlier are not
+        stored.
+
+        Args:
+            grid_search (object): fitted search.
+        """
+        results = grid_search.cv_results_
+        last_iteration = np.max(results['iter']) if 'iter' in results else None
+
+        for i, params in enumerate(results['params']):
+            if last_iteration is not None and results['iter'][i] != last_iteration:
+                continue
+
+            candidate = {parameter: value for parameter, value in params.items()
+                         if parameter not in self.search_parameters}
+            self.score_cache[self.candidate_key(candidate)] = (results['mean_test_score'][i], params)
+
+    def select_best(self, grid_search, keys):
+        """
+        Sets the best candidate of the current grid, either evaluated in this round or cached from an earlier one, as
+        the result of the search. The model is only refitted when the best candidate comes from the cache.
+
+        Args:
+            grid_search (object): search fitted on the candidates that were not cached.
+            keys (list): cache keys of all the candidates of the current grid.
+        """
+        best_score, best_params = -np.inf, None
+        for key in keys:
+            score, params = self.score_cache.get(key, (np.nan, None))
+            if not np.isnan(score) and score > best_score:
+                best_score, best_params = score, params
+
+        if best_params is None or best_params == grid_search.best_params_:
+            return
+
+        self.set_best(grid_search, best_params, best_score)
+
+    def set_best(self, grid_search, params, score):
+        """
+        Sets the best candidate of a search and refits the model with its hyperparameters on all the training data.
+
+        Args:
+            grid_search (object): search whose result is set.
+            params (dict): hyperparameters of the best candidate.
+            score (float): cross validation score of the best candidate.
+        """
+        grid_search.best_params_ = params
+        grid_search.best_score_ = score
+        grid_search.best_estimator_ = clone(self.model).set_params(**params).fit(self.X, self.y)
+
+    def get_search_grid(self):
+        """
+        Retrieves the grid explored by the search. The hyperparameters set by the search, such as the number of
+        estimators when it is the resource of the successive halving search, are left out, and the regularization of
+        the path-based training is always part of it.
+
+        Returns:
+            The dictionary of hyperparameter values.
+        """
+        if self.search_strategy == 'path' and self.path_parameter not in self.param_grid:
+            return {**self.param_grid, self.path_parameter: [self.model.get_params()[self.path_parameter]]}
+
+        return {parameter: values for parameter, values in self.param_grid.items()
+                if parameter not in self.search_parameters}
+
+    def get_resource(self):
+        """
+        Retrieves the resource that is increased between the iterations of the successive halving search. The number
+        of estimators is only used by the ensemble models, the rest of them fall back to the number of samples.
+
+        Returns:
+            'n_samples', 'n_estimators' or None if the exhaustive grid search is used.
+        """
+        if self.search_strategy != 'halving':
+            return None
+
+        if self.parameters.get('halving_resource') == 'n_estimators' and 'n_estimators' in self.model.get_params():
+            return 'n_estimators'
+
+        return 'n_samples'
+
+    def fit_search(self, param_grid):
+        """
+        Fits the hyperparameter search of the given candidates within the CPUs of the combination. The fits of every
+        candidate and fold are the parallel jobs, and every job gets an equal share of the rest of the CPUs as
+        estimator and BLAS threads.
+
+        Args:
+            param_grid (list): grids of the candidates to be evaluated.
+
+        Returns:
+            The fitted search object.
+        """
+        if self.search_strategy == 'path':
+            return self.fit_path_search([{parameter: values[0] for parameter, values in grid.items()}
+                                         for grid in param_grid])
+        # Only the models with native_parameters keep this strategy, and they implement fit_native_search
+        if self.search_strategy == 'early_stopping':
+            return self.fit_native_search([{parameter: values[0] for parameter, values in grid.items()}
+                                           for grid in param_grid])
+
+        n_jobs, threads = resources.allocate(-1, n_tasks=len(param_grid) * len(self.folds))
+        self.model.set_params(**resources.estimator_threads(self.model.get_params(), threads))
+
+        grid_search = self.create_search(param_grid, n_jobs)
+        with resources.limits(threads):
+            grid_search.fit(self.X, self.y)
+
+        return grid_search
+
+    def fit_path_search(self, candidates):
+        """
+        Scores the candidates along regularization paths. The candidates that only differ in the regularization form a
+        path, which is fitted once per fold from the strongest to the weakest regularization, every point starting from
+        the coefficients of the previous one. Settings whose solver ignores warm starts would only chain cold fits, so
+        each of their points is fitted independently as in the grid search. The out-of-fold scores of every point are
+        logged to a csv file in the output folder.
+
+        Args:
+            candidates (list): hyperparameters of the candidates to be evaluated.
+
+        Returns:
+            A search object with the cross validation results of every candidate and the best one refitted.
+        """
+        paths = {}
+        for candidate in candidates:
+            setting = {parameter: value for parameter, value in candidate.items() if parameter != self.path_parameter}
+            paths.setdefault(repr(sorted(setting.items())), (setting, set()))[1].add(candidate[self.path_parameter])
+        paths = [(setting, sorted(values, reverse=not self.path_ascending)) for setting, values in paths.values()]
+        paths = [(setting, path) for setting, values in paths
+                 for path in ([values] if self.supports_warm_start(setting) else [[value] for value in values])]
+
+        n_jobs, threads = resources.allocate(-1, n_tasks=len(paths) * len(self.folds))
+        self.model.set_params(**resources.estimator_threads(self.model.get_params(), threads))
+
+        with resources.limits(threads):
+            fold_scores = Parallel(n_jobs=n_jobs)(
+                delayed(tracing.task(fit_path))(self.model, setting, self.path_parameter, path, self.X, self.y, train,
+                                                test)
+                for setting, path in paths for train, test in self.folds)
+
+        points = []
+        point_scores = []
+        for i, (setting, path) in enumerate(paths):
+            scores = np.asarray(fold_scores[i * len(self.folds):(i + 1) * len(self.folds)])
+            for j, value in enumerate(path):
+                points.append({**setting, self.path_parameter: value})
+                point_scores.append(scores[:, j])
+
+        grid_search = self.build_search(candidates, points, np.asarray(point_scores), n_jobs)
+        results = grid_search.cv_results_
+
+        if self.parameters.get('output_path'):
+            log_path = self.parameters['output_path'] + self.parameters['model'] + '_regularization_path.csv'
+            log = pd.DataFrame(results['params'])
+            log.insert(0, 'round', self.search_round)
+            log['mean_score'] = results['mean_test_score']
+            log['std_score'] = results['std_test_score']
+            log.to_csv(log_path, mode='a', header=not os.path.exists(log_path), index=False, float_format='%.4f')
+
+        return grid_search
+
+    def supports_warm_start(self, setting):
+        """
+        Checks whether the model continues from its previous coefficients with the given hyperparameters.
+
+        Args:
+            setting (dict): hyperparameters other than the regularization.
+
+        Returns:
+            True if the points of a path can be fitted with warm starts.
+        """
+        return 'warm_start' in self.model.get_params()
+
+    def build_search(self, candidates, points, scores, n_jobs=-1):
+        """
+        Builds a search object from cross validation scores computed outside of the scikit-learn searches, with the
+        results in their format, and refits its best point.
+
+        Args:
+            candidates (list): hyperparameters of the evaluated candidates.
+            points (list): hyperparameters of every scored point.
+            scores (array): score of every point (rows) in every fold (columns).
+            n_jobs (int): number of parallel jobs of the search.
+
+        Returns:
+            The search object with its results and best point.
+        """
+        results = {'params': points, 'mean_test_score': np.mean(scores, axis=1),
+                   'std_test_score': np.std(scores, axis=1)}
+        for fold in range(scores.shape[1]):
+            results[f'split{fold}_test_score'] = scores[:, fold]
+        mean_scores = np.where(np.isnan(results['mean_test_score']), -np.inf, results['mean_test_score'])
+        results['rank_test_score'] = np.argsort(np.argsort(-mean_scores, kind='stable')) + 1
+
+        grid_search = self.create_search([{parameter: [value] for parameter, value in candidate.items()}
+                                          for candidate in candidates], n_jobs)
+        grid_search.cv_results_ = results
+        best = int(np.argmax(mean_scores))
+        self.set_best(grid_search, points[best], results['mean_test_score'][best])
+
+        return grid_search
+
+    def create_search(self, param_grid, n_jobs=-1):
+        """
+        Creates the hyperparameter search of the given candidates. Successive halving evaluates all the candidates
+        with a small amount of the resource and only the best third of them goes on to the next iteration, which gets
+        three times as much, until the last candidates are evaluated with all of it.
+
+        Args:
+            param_grid (list): grids of the candidates to be evaluated.
+            n_jobs (int): number of parallel jobs, -1 for all the CPUs.
+
+        Returns:
+            The search object, not fitted yet.
+        """
+        if self.resource is None:
+            return GridSearchCV(self.model, param_grid, cv=self.folds, scoring='roc_auc', n_jobs=n_jobs, verbose=1)
+
+        # The highest number of estimators of the grid is the full budget
+        max_resources = 'auto'
+        if self.resource == 'n_estimators':
+            max_resources = max(self.param_grid.get('n_estimators') or [self.model.get_params()['n_estimators'] or 100])
+
+        return HalvingGridSearchCV(self.model, param_grid, cv=self.folds, scoring='roc_auc', n_jobs=n_jobs, verbose=1,
+                                   resource=self.resource, max_resources=max_resources, min_resources='exhaust',
+                                   random_state=self.parameters['seed'])
+
     def generate_interval(self, x, y, n):
         """
         Generates an interval between x and y [x,y] of size n
@@ -119,6 +550,10 @@ class Model:
         of values that will be used in order to optimize even more the hyperparameters.
         """
         for parameter, value in self.best_parameters.items():
+            # The hyperparameters set by the search are not refined, such as the budget of the successive halving
+            if parameter in self.search_parameters:
+                continue
+
             if any(isinstance(value, cls) for cls in [int, float]) and len(self.param_grid[parameter]) > 1:
                 parameter_values = self.param_grid[parameter]
                 position = parameter_values.index(value)
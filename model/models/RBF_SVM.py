@@ -1,5 +1,46 @@
+from model.models.KernelCache import KernelCache
 from model.models.Model import Model
+from joblib import Parallel, delayed
+from sklearn.base import clone
+from sklearn.metrics import get_scorer
 from sklearn.svm import SVC
+from sklearn.utils import _safe_indexing
+import numpy as np
+
+import resources
+import tracing
+
+
+def fit_kernel(estimator, settings, matrix, y, train, test):
+    """
+    Fits the SVM with a precomputed kernel over one fold for every setting and scores it on the validation part.
+
+    Args:
+        estimator (object): model to be fitted.
+        settings (list): hyperparameters of every fit, other than gamma.
+        matrix (array): RBF kernel between all the samples.
+        y (array): target data.
+        train (array): indices of the training part of the fold.
+        test (array): indices of the validation part of the fold.
+
+    Returns:
+        The list of ROC AUC scores of every setting, NaN where the fit failed.
+    """
+    kernel_train, kernel_test = KernelCache.split(matrix, train, train), KernelCache.split(matrix, test, train)
+    y_train, y_test = _safe_indexing(y, train), _safe_indexing(y, test)
+    scorer = get_scorer('roc_auc')
+
+    scores = []
+    with tracing.span('train/kernel_fold', settings=len(settings)):
+        for setting in settings:
+            model = clone(estimator).set_params(**setting, kernel='precomputed')
+            try:
+                model.fit(kernel_train, y_train)
+                scores.append(scorer(model, kernel_test, y_test))
+            except ValueError:
+                scores.append(np.nan)
+
+    return scores
 
 
 class RBF_SVM(Model):
@@ -28,3 +69,73 @@ class RBF_SVM(Model):
         Used for training the model, it just calls to the method in the superclass.
         """
         return super().train()
+
+    def fit_search(self, param_grid):
+        """
+        Fits the hyperparameter search of the given candidates over the kernel cache of the training data. The
+        successive halving search fits its own subsamples, so it keeps the RBF kernel of the SVM.
+
+        Args:
+            param_grid (list): grids of the candidates to be evaluated.
+
+        Returns:
+            The fitted search object.
+        """
+        if self.search_strategy == 'halving':
+            return super().fit_search(param_grid)
+
+        return self.fit_kernel_search([{parameter: values[0] for parameter, values in grid.items()}
+                                       for grid in param_grid])
+
+    def fit_kernel_search(self, candidates):
+        """
+        Scores the candidates with precomputed kernels. The candidates that share a gamma share its kernel, which is
+        built once from the cached distances and sliced for the rows and columns of every fold.
+
+        Args:
+            candidates (list): hyperparameters of the candidates to be evaluated.
+
+        Returns:
+            A search object with the cross validation results of every candidate and the best one refitted.
+        """
+        kernel_cache = self.get_kernel_cache()
+        default_gamma = self.model.get_params()['gamma']
+
+        groups = {}
+        for i, candidate in enumerate(candidates):
+            gamma = candidate.get('gamma', default_gamma)
+            groups.setdefault(repr(gamma), (gamma, []))[1].append(i)
+        groups = list(groups.values())
+
+        settings = [[{parameter: value for parameter, value in candidates[j].items() if parameter != 'gamma'}
+                     for j in group] for _, group in groups]
+
+        n_jobs, threads = resources.allocate(-1, n_tasks=len(groups) * len(self.folds))
+
+        # The kernel of a gamma is only rebuilt for every fold if it depends on the training samples
+        with resources.limits(threads):
+            fold_scores = Parallel(n_jobs=n_jobs)(
+                delayed(tracing.task(fit_kernel))(self.model, settings[i], kernel_cache.kernel(gamma, train), self.y,
+                                                  train, test)
+                for i, (gamma, group) in enumerate(groups) for train, test in self.folds)
+
+        # The results keep the order of the candidates, as in the grid search
+        scores = np.empty((len(candidates), len(self.folds)))
+        for i, (gamma, group) in enumerate(groups):
+            scores[group] = np.asarray(fold_scores[i * len(self.folds):(i + 1) * len(self.folds)]).T
+
+        return self.build_search(candidates, candidates, scores, n_jobs)
+
+    def get_kernel_cache(self):
+        """
+        Retrieves the kernel cache of the training data, building it the first time. It is kept in the parameters so
+        the evaluation reuses it.
+
+        Returns:
+            The kernel cache.
+        """
+        if self.parameters.get('kernel_cache') is None:
+            dtype = self.parameters.get('kernel_dtype') or 'float64'
+            self.parameters['kernel_cache'] = KernelCache(self.X, dtype=dtype)
+
+        return self.parameters['kernel_cache']
@@ -0,0 +1,245 @@
+import math
+
+import numpy as np
+from scipy.special import logsumexp
+from scipy.stats import truncnorm
+
+
+class TPESearch:
+    """
+    Tree-structured Parzen Estimator that proposes the hyperparameters to be evaluated from the scores of the previous
+    trials. The trials are split into the best ones and the rest, a Parzen density is fitted to every hyperparameter of
+    each group, and the proposals are the candidates sampled from the density of the best trials that are most likely
+    under it compared to the density of the rest.
+
+    Every hyperparameter of the grid can be a list of values, which are taken as categories, or a range given as a
+    dictionary with 'low' and 'high' bounds, an optional 'log' flag for a logarithmic scale and an optional 'type',
+    'int' or 'float', inferred from the bounds if missing.
+    """
+
+    def __init__(self, param_grid, seed=None, n_startup=10, gamma=0.25, n_candidates=24):
+        """
+        Initialize a new instance of TPESearch
+
+        Args:
+            param_grid (dict): hyperparameters and their values or ranges.
+            seed (int): seed of the proposals.
+            n_startup (int): number of trials sampled at random before the densities are used.
+            gamma (float): fraction of the trials taken as the best ones, at most 25 of them.
+            n_candidates (int): number of candidates sampled for every proposal.
+        """
+        self.space = {parameter: self.parse_dimension(parameter, values) for parameter, values in param_grid.items()}
+        self.rng = np.random.default_rng(seed)
+        self.n_startup = n_startup
+        self.gamma = gamma
+        self.n_candidates = n_candidates
+
+        # Every trial is stored in the internal space: index of the category, or value on the (log) scale of the range
+        self.observations = {parameter: [] for parameter in self.space}
+        self.scores = []
+
+    @staticmethod
+    def parse_dimension(parameter, values):
+        """
+        Converts the values of a hyperparameter of the grid to its dimension of the search space.
+
+        Args:
+            parameter (string): name of the hyperparameter.
+            values (list, dict or value): categories, range, or a single fixed value.
+
+        Returns:
+            A dictionary describing the dimension.
+        """
+        if isinstance(values, dict):
+            if 'low' not in values or 'high' not in values or values['low'] >= values['high']:
+                raise ValueError(f"The range of {parameter} needs a 'low' bound lower than its 'high' bound")
+
+            if 'type' in values:
+                value_type = values['type']
+            elif isinstance(values['low'], int) and isinstance(values['high'], int):
+                value_type = 'int'
+            else:
+                value_type = 'float'
+            if value_type not in ('int', 'float'):
+                raise ValueError(f"The type of {parameter} has to be 'int' or 'float'")
+
+            log = bool(values.get('log', False))
+            if log and values['low'] <= 0:
+                raise ValueError(f"The range of {parameter} has to be positive for a logarithmic scale")
+
+            # Integers cover half a unit on each side, so every value is as likely when it is rounded
+            low, high = values['low'], values['high']
+            if value_type == 'int':
+                low, high = low - 0.5, high + 0.5
+            if log:
+                low, high = math.log(low), math.log(high)
+
+            return {'type': value_type, 'low': low, 'high': high, 'log': log,
+                    'bounds': (values['low'], values['high'])}
+
+        if not isinstance(values, list):
+            values = [values]
+        if not values:
+            raise ValueError(f"The list of values of {parameter} is empty")
+
+        return {'type': 'categorical', 'choices': values}
+
+    def suggest(self, n):
+        """
+        Proposes the hyperparameters of the next trials.
+
+        Args:
+            n (int): number of trials.
+
+        Returns:
+            The list of dictionaries of hyperparameters.
+        """
+        if len(self.scores) < self.n_startup:
+            internal = [{parameter: self.sample_prior(dimension) for parameter, dimension in self.space.items()}
+                        for _ in range(n)]
+        else:
+            internal = [self.propose() for _ in range(n)]
+
+        return [self.to_params(point) for point in internal]
+
+    def observe(self, params, score):
+        """
+        Adds the score of a trial.
+
+        Args:
+            params (dict): hyperparameters of the trial, as proposed.
+            score (float): score of the trial, higher is better. NaN scores are taken as the worst ones.
+        """
+        for parameter, dimension in self.space.items():
+            self.observations[parameter].append(self.to_internal(dimension, params[parameter]))
+        self.scores.append(-np.inf if score is None or np.isnan(score) else score)
+
+    def propose(self):
+        """
+        Samples candidates from the densities of the best trials and picks the one with the highest ratio between the
+        density of the best trials and the density of the rest.
+
+        Returns:
+            The hyperparameters in the internal space.
+        """
+        order = np.argsort(-np.asarray(self.scores), kind='stable')
+        n_good = min(25, max(1, math.ceil(self.gamma * len(order))))
+        good, bad = order[:n_good], order[n_good:]
+
+        candidates = {}
+        log_ratio = np.zeros(self.n_candidates)
+        for parameter, dimension in self.space.items():
+            observations = np.asarray(self.observations[parameter], dtype=float)
+            good_density = self.fit_density(dimension, observations[good])
+            bad_density = self.fit_density(dimension, observations[bad])
+
+            candidates[parameter] = self.sample_density(dimension, good_density, self.n_candidates)
+            log_ratio += self.log_density(dimension, good_density, candidates[parameter]) - \
+                self.log_density(dimension, bad_density, candidates[parameter])
+
+        best = int(np.argmax(log_ratio))
+        return {parameter: values[best] for parameter, values in candidates.items()}
+
+    def sample_prior(self, dimension):
+        """
+        Samples a value uniformly from a dimension.
+
+        Returns:
+            The value in the internal space.
+        """
+        if dimension['type'] == 'categorical':
+            return int(self.rng.integers(len(dimension['choices'])))
+
+        return float(self.rng.uniform(dimension['low'], dimension['high']))
+
+    def fit_density(self, dimension, observations):
+        """
+        Fits the Parzen density of a dimension to the observed values, with a uniform prior so every value remains
+        possible. Ranges use a truncated Gaussian kernel on every observation and categories their smoothed frequency.
+
+        Returns:
+            The log probability of every category, or the centers and widths of the kernels of a range.
+        """
+        if dimension['type'] == 'categorical':
+            counts = np.bincount(observations.astype(int), minlength=len(dimension['choices'])) + 1.0
+            return np.log(counts / counts.sum())
+
+        width = dimension['high'] - dimension['low']
+        centers = np.r_[observations, (dimension['low'] + dimension['high']) / 2]
+        if len(observations) > 1:
+            bandwidth = 1.06 * np.std(observations) * len(observations) ** -0.2
+        else:
+            bandwidth = width
+        bandwidth = np.clip(bandwidth, width / 100, width)
+        widths = np.r_[np.full(len(observations), bandwidth), width]
+
+        return centers, widths
+
+    def sample_density(self, dimension, density, n):
+        """
+        Samples values from the Parzen density of a dimension.
+
+        Returns:
+            The array of values in the internal space.
+        """
+        if dimension['type'] == 'categorical':
+            return self.rng.choice(len(density), size=n, p=np.exp(density))
+
+        centers, widths = density
+        components = self.rng.integers(len(centers), size=n)
+        a = (dimension['low'] - centers[components]) / widths[components]
+        b = (dimension['high'] - centers[components]) / widths[components]
+
+        return truncnorm.rvs(a, b, loc=centers[components], scale=widths[components], random_state=self.rng)
+
+    def log_density(self, dimension, density, values):
+        """
+        Computes the log of the Parzen density of a dimension at the given values.
+
+        Returns:
+            The array of log densities.
+        """
+        if dimension['type'] == 'categorical':
+            return density[values.astype(int)]
+
+        centers, widths = density
+        a = (dimension['low'] - centers) / widths
+        b = (dimension['high'] - centers) / widths
+        log_pdf = truncnorm.logpdf(values[:, np.newaxis], a, b, loc=centers, scale=widths)
+
+        return logsumexp(log_pdf, axis=1) - math.log(len(centers))
+
+    def to_params(self, point):
+        """
+        Converts a point of the internal space to the hyperparameters of the model.
+
+        Returns:
+            The dictionary of hyperparameters.
+        """
+        params = {}
+        for parameter, dimension in self.space.items():
+            value = point[parameter]
+            if dimension['type'] == 'categorical':
+                params[parameter] = dimension['choices'][int(value)]
+                continue
+
+            value = math.exp(value) if dimension['log'] else float(value)
+            low, high = dimension['bounds']
+            if dimension['type'] == 'int':
+                params[parameter] = int(min(max(round(value), low), high))
+            else:
+                params[parameter] = float(min(max(value, low), high))
+
+        return params
+
+    def to_internal(self, dimension, value):
+        """
+        Converts the value of a hyperparameter to the internal space.
+
+        Returns:
+            The index of the category, or the value on the scale of the range.
+        """
+        if dimension['type'] == 'categorical':
+            return dimension['choices'].index(value)
+
+        return math.log(value) if dimension['log'] else float(value)
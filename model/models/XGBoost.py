@@ -1,8 +1,17 @@
 from model.models.Model import Model
+from sklearn.base import clone
+from sklearn.utils import _safe_indexing
+import numpy as np
 import xgboost as xgb
 
+import resources
+import tracing
+
 
 class XGBoost(Model):
+    # The native cross validation finds the number of boosting rounds by early stopping and always uses histograms
+    native_parameters = ['n_estimators', 'tree_method']
+
     # param_grid = {
     #     'learning_rate': [0.01, 0.1, 0.2, 0.3],
     #     'n_estimators': [50, 100, 200, 300],
@@ -41,8 +50,77 @@ class XGBoost(Model):
 
         Model.__init__(self, parameters, xgb.XGBClassifier(random_state=self.parameters['seed']))
 
+        # Quantized training and validation matrices of every fold, built once for every number of bins
+        self.fold_matrices = {}
+
     def train(self):
         """
         Used for training the model, it just calls to the method in the superclass.
         """
         return super().train()
+
+    def fit_native_search(self, candidates):
+        """
+        Scores the candidates with the native cross validation of XGBoost. The trees are grown with the histogram
+        method over quantized matrices of every fold that are built once and reused by all the candidates and rounds,
+        and the number of boosting rounds is the one with the highest mean validation AUC of the folds, training every
+        fold until its AUC stops improving or the highest n_estimators of the grid is reached.
+
+        Args:
+            candidates (list): hyperparameters of the candidates to be evaluated.
+
+        Returns:
+            A search object with the cross validation results of every candidate, with their number of rounds, and the
+            best one refitted.
+        """
+        max_rounds = max(self.param_grid.get('n_estimators') or [self.model.get_params()['n_estimators'] or 100])
+        early_stopping_rounds = max(10, max_rounds // 10)
+        _, threads = resources.allocate(1)
+
+        points = []
+        scores = []
+        for candidate in candidates:
+            estimator = clone(self.model).set_params(**candidate, tree_method='hist', eval_metric='auc',
+                                                     **resources.estimator_threads(self.model.get_params(), threads))
+            booster_params = {key: value for key, value in estimator.get_xgb_params().items() if value is not None}
+
+            # Folds that stop early keep their last AUC for the rest of the rounds
+            curves = []
+            for train_matrix, validation_matrix in self.get_fold_matrices(booster_params.get('max_bin', 256)):
+                evaluation = {}
+                xgb.train(booster_params, train_matrix, num_boost_round=max_rounds,
+                          evals=[(validation_matrix, 'validation')], early_stopping_rounds=early_stopping_rounds,
+                          evals_result=evaluation, verbose_eval=False)
+                curve = evaluation['validation']['auc']
+                curves.append(curve + [curve[-1]] * (max_rounds - len(curve)))
+
+            curves = np.asarray(curves)
+            rounds = int(np.argmax(curves.mean(axis=0))) + 1
+            points.append({**candidate, 'n_estimators': rounds, 'tree_method': 'hist'})
+            scores.append(curves[:, rounds - 1])
+
+        return self.build_search(candidates, points, np.asarray(scores), n_jobs=1)
+
+    def get_fold_matrices(self, max_bin):
+        """
+        Retrieves the quantized matrices of the folds, building them the first time. The validation matrix of every
+        fold uses the bins of its training matrix.
+
+        Args:
+            max_bin (int): maximum number of bins of every feature.
+
+        Returns:
+            The list of (training, validation) matrices of every fold.
+        """
+        if max_bin not in self.fold_matrices:
+            with tracing.span('train/fold_matrices', model=self.parameters['model']):
+                matrices = []
+                for train, test in self.folds:
+                    train_matrix = xgb.QuantileDMatrix(_safe_indexing(self.X, train), _safe_indexing(self.y, train),
+                                                       max_bin=max_bin)
+                    validation_matrix = xgb.QuantileDMatrix(_safe_indexing(self.X, test), _safe_indexing(self.y, test),
+                                                            ref=train_matrix)
+                    matrices.append((train_matrix, validation_matrix))
+                self.fold_matrices[max_bin] = matrices
+
+        return self.fold_matrices[max_bin]
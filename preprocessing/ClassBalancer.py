@@ -1,5 +1,4 @@
-from imblearn.over_sampling import SMOTE, RandomOverSampler
-from imblearn.under_sampling import RandomUnderSampler
+import registry
 
 
 class ClassBalancer:
@@ -28,12 +27,9 @@ class ClassBalancer:
         Returns:
             Returns the balanced dataframe.
         """
-        if self.parameters['class_balancer'] == 'smote':
-            return self.transform(SMOTE(random_state=self.parameters['seed']))
-        elif self.parameters['class_balancer'] == 'random_oversampling':
-            return self.transform(RandomOverSampler(random_state=self.parameters['seed']))
-        elif self.parameters['class_balancer'] == 'random_undersampling':
-            return self.transform(RandomUnderSampler(random_state=self.parameters['seed']))
+        if self.parameters['class_balancer'] in registry.registry['class_balancer']:
+            balancer_class = registry.load('class_balancer', self.parameters['class_balancer'])
+            return self.transform(balancer_class(random_state=self.parameters['seed']))
 
         else:
             return self.dataframe
@@ -0,0 +1,115 @@
+import os
+
+import pandas as pd
+
+try:
+    import pyarrow
+    import pyarrow.feather as feather
+    import pyarrow.ipc as ipc
+    import pyarrow.parquet as parquet
+except ImportError:
+    pyarrow = None
+
+
+class DataLoader:
+    """
+    Reads the input data into a dataframe, choosing the reader according to the file extension. Only the columns that
+    are going to be used are read, and columnar formats are memory-mapped instead of copied into memory.
+    """
+
+    csv_extensions = ['.csv', '.txt']
+    parquet_extensions = ['.parquet', '.pq']
+    arrow_extensions = ['.feather', '.arrow', '.ipc']
+
+    def __init__(self, path, columns=None, csv_engine='auto'):
+        """
+        Initialize a new instance of DataLoader
+
+        Args:
+            path (string): path to the data file.
+            columns (list): columns to be read, None reads all of them. Columns that do not exist in the file are
+            ignored so the preprocessing pipeline can report them.
+            csv_engine (string): 'pyarrow' for the multithreaded Arrow csv reader, 'c' for the default pandas reader
+            or 'auto' to use pyarrow when it is installed.
+        """
+        self.path = path
+        self.columns = columns
+        self.csv_engine = csv_engine
+
+    def load(self):
+        """
+        Invokes the appropriate reader according to the file extension.
+
+        Returns:
+            The dataframe containing the data.
+        """
+        extension = os.path.splitext(self.path)[1].lower()
+
+        if extension in self.parquet_extensions:
+            return self.read_parquet()
+        elif extension in self.arrow_extensions:
+            return self.read_arrow()
+
+        else:
+            return self.read_csv()
+
+    def select_columns(self, available_columns):
+        """
+        Keeps only the requested columns that exist in the file, in the order they were requested.
+
+        Args:
+            available_columns (list): columns present in the file.
+
+        Returns:
+            The list of columns to be read, or None if all of them have to be read.
+        """
+        if not self.columns:
+            return None
+
+        available_columns = set(available_columns)
+
+        return [column for column in self.columns if column in available_columns]
+
+    def read_csv(self):
+        """
+        Reads a comma separated file, only parsing the selected columns.
+
+        Returns:
+            The dataframe containing the data.
+        """
+        columns = self.select_columns(pd.read_csv(self.path, nrows=0).columns)
+
+        engine = self.csv_engine
+        if engine == 'auto':
+            engine = 'c' if pyarrow is None else 'pyarrow'
+
+        return pd.read_csv(self.path, usecols=columns, engine=engine)
+
+    def read_parquet(self):
+        """
+        Reads a Parquet file, only loading the selected column chunks.
+
+        Returns:
+            The dataframe containing the data.
+        """
+        if pyarrow is None:
+            raise ImportError("pyarrow is needed for reading Parquet files")
+
+        columns = self.select_columns(parquet.read_schema(self.path).names)
+
+        return parquet.read_table(self.path, columns=columns, memory_map=True).to_pandas()
+
+    def read_arrow(self):
+        """
+        Reads a Feather or Arrow IPC file, only loading the selected columns.
+
+        Returns:
+            The dataframe containing the data.
+        """
+        if pyarrow is None:
+            raise ImportError("pyarrow is needed for reading Feather and Arrow IPC files")
+
+        with pyarrow.memory_map(self.path) as source:
+            columns = self.select_columns(ipc.open_file(source).schema.names)
+
+        return feather.read_table(self.path, columns=columns, memory_map=True).to_pandas()
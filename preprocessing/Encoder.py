@@ -1,5 +1,6 @@
 import pandas as pd
-from category_encoders import TargetEncoder
+
+import registry
 
 
 class Encoder():
@@ -60,7 +61,7 @@ class Encoder():
         """
         dataframe[target] = pd.get_dummies(dataframe[target], prefix=target, drop_first=True).astype(int)
 
-        encoder = TargetEncoder(handle_missing='return_nan')
+        encoder = registry.load('encoder', 'target_encoding')(handle_missing='return_nan')
         encoder = encoder.fit(dataframe, dataframe[target])
 
         dataframe = encoder.transform(dataframe)
@@ -0,0 +1,229 @@
+import hashlib
+import json
+import os
+import shutil
+import tempfile
+
+import numpy as np
+import pandas as pd
+
+
+class PreprocessingCache:
+    """
+    Content-addressed on-disk cache of preprocessed datasets. Every entry is a directory named after the hash of the
+    input file and the preprocessing parameters, containing the train/test data as memory-mappable .npy files and a
+    metadata file with everything needed to rebuild the dataframes.
+    """
+
+    # Parameters that change the result of the preprocessing pipeline
+    key_parameters = ['target', 'features', 'imputer', 'scaler', 'encoder', 'feature_selector', 'num_features',
+                      'class_balancer', 'seed', 'test_size', 'evaluation_technique']
+
+    # Data generated by the preprocessing pipeline
+    data_parameters = ['dataframe', 'X_train', 'X_test', 'y_train', 'y_test']
+
+    # Parameters that the preprocessing pipeline fills in or replaces with '-'
+    updated_parameters = ['imputer', 'scaler', 'encoder', 'feature_selector', 'num_features', 'class_balancer',
+                          'seed', 'test_size', 'sample_size']
+
+    def __init__(self, directory, data_hash, max_size=10 * 1024 ** 3):
+        """
+        Initialize a new instance of PreprocessingCache
+
+        Args:
+            directory (string): path to the cache directory, created if it does not exist.
+            data_hash (string): hash of the input file, see hash_file.
+            max_size (int): maximum size of the cache in bytes, least recently used entries are evicted above it.
+        """
+        self.directory = directory
+        self.data_hash = data_hash
+        self.max_size = max_size
+
+        os.makedirs(self.directory, exist_ok=True)
+
+    @staticmethod
+    def hash_file(path, chunk_size=1024 ** 2):
+        """
+        Computes the hash of the content of a file.
+
+        Args:
+            path (string): path to the file.
+            chunk_size (int): number of bytes read at a time.
+
+        Returns:
+            The hexadecimal sha256 digest of the file.
+        """
+        digest = hashlib.sha256()
+        with open(path, 'rb') as file:
+            for chunk in iter(lambda: file.read(chunk_size), b''):
+                digest.update(chunk)
+
+        return digest.hexdigest()
+
+    def generate_key(self, parameters):
+        """
+        Generates the key of the entry for a combination of parameters.
+
+        Args:
+            parameters (dict): parameters of the combination, before running the preprocessing.
+
+        Returns:
+            The hexadecimal sha256 digest identifying the preprocessed dataset.
+        """
+        relevant_parameters = {key: parameters.get(key) for key in self.key_parameters}
+        content = self.data_hash + json.dumps(relevant_parameters, sort_keys=True, default=str)
+
+        return hashlib.sha256(content.encode()).hexdigest()
+
+    def load(self, key):
+        """
+        Retrieves a preprocessed dataset from the cache.
+
+        Args:
+            key (string): key of the entry.
+
+        Returns:
+            A dictionary with the data and the updated parameters, or None if the entry does not exist.
+        """
+        entry_path = os.path.join(self.directory, key)
+        metadata_path = os.path.join(entry_path, 'metadata.json')
+        if not os.path.exists(metadata_path):
+            return None
+
+        try:
+            with open(metadata_path, 'r') as file:
+                metadata = json.load(file)
+
+            parameters = dict(metadata['parameters'])
+            for name, frame_metadata in metadata['frames'].items():
+                parameters[name] = self.load_frame(entry_path, name, frame_metadata)
+        except (OSError, ValueError, KeyError):
+            # A corrupted entry is treated as a miss and will be overwritten
+            shutil.rmtree(entry_path, ignore_errors=True)
+            return None
+
+        # Used for the least recently used eviction
+        os.utime(metadata_path)
+
+        return parameters
+
+    def store(self, key, parameters):
+        """
+        Stores a preprocessed dataset in the cache. Datasets that still contain non numerical columns are not cached
+        since they can not be memory-mapped.
+
+        Args:
+            key (string): key of the entry.
+            parameters (dict): parameters of the combination after running the preprocessing.
+        """
+        entry_path = os.path.join(self.directory, key)
+        if os.path.exists(entry_path):
+            return
+
+        # The entry is written in a temporary directory and moved once complete, so other processes never see it
+        # half written
+        temporary_path = tempfile.mkdtemp(prefix='.' + key, dir=self.directory)
+        try:
+            frames = {}
+            for name in self.data_parameters:
+                frames[name] = self.store_frame(temporary_path, name, parameters[name])
+
+            metadata = {'parameters': {name: parameters[name] for name in self.updated_parameters if name in parameters},
+                        'frames': frames}
+            with open(os.path.join(temporary_path, 'metadata.json'), 'w') as file:
+                json.dump(metadata, file, default=lambda value: value.item() if isinstance(value, np.generic) else str(value))
+
+            os.rename(temporary_path, entry_path)
+        except (OSError, TypeError, ValueError):
+            # Either the dataset can not be cached or another process stored the same entry first
+            shutil.rmtree(temporary_path, ignore_errors=True)
+            return
+
+        self.evict()
+
+    def store_frame(self, path, name, frame):
+        """
+        Saves a dataframe, a series or a scalar into the entry directory, one .npy file per dtype.
+
+        Args:
+            path (string): path to the entry directory.
+            name (string): name of the data, used as file prefix.
+            frame (dataframe, series or scalar): data to be saved.
+
+        Returns:
+            The metadata needed to load the data back.
+        """
+        if not isinstance(frame, (pd.DataFrame, pd.Series)):
+            return {'kind': 'scalar', 'value': frame}
+
+        index = frame.index.to_numpy()
+        if index.dtype == object:
+            raise TypeError("Only numerical indexes can be cached")
+        np.save(os.path.join(path, f"{name}.index.npy"), index)
+
+        if isinstance(frame, pd.Series):
+            values = frame.to_numpy()
+            if values.dtype == object:
+                raise TypeError("Only numerical data can be cached")
+            np.save(os.path.join(path, f"{name}.0.npy"), values)
+
+            return {'kind': 'series', 'name': frame.name}
+
+        blocks = []
+        for dtype, columns in frame.columns.groupby(frame.dtypes).items():
+            if np.dtype(dtype) == object:
+                raise TypeError("Only numerical data can be cached")
+            np.save(os.path.join(path, f"{name}.{len(blocks)}.npy"), np.ascontiguousarray(frame[columns].to_numpy()))
+            blocks.append(list(columns))
+
+        return {'kind': 'dataframe', 'blocks': blocks, 'columns': frame.columns.tolist()}
+
+    def load_frame(self, path, name, metadata):
+        """
+        Loads back the data saved by store_frame, memory-mapping the .npy files.
+
+        Args:
+            path (string): path to the entry directory.
+            name (string): name of the data.
+            metadata (dict): metadata returned by store_frame.
+
+        Returns:
+            The dataframe, series or scalar.
+        """
+        if metadata['kind'] == 'scalar':
+            return metadata['value']
+
+        index = np.load(os.path.join(path, f"{name}.index.npy"))
+
+        if metadata['kind'] == 'series':
+            values = np.load(os.path.join(path, f"{name}.0.npy"), mmap_mode='r')
+            return pd.Series(values, index=index, name=metadata['name'], copy=False)
+
+        blocks = [pd.DataFrame(np.load(os.path.join(path, f"{name}.{i}.npy"), mmap_mode='r'), columns=columns,
+                               index=index, copy=False)
+                  for i, columns in enumerate(metadata['blocks'])]
+        if len(blocks) == 1:
+            return blocks[0]
+
+        return pd.concat(blocks, axis=1)[metadata['columns']]
+
+    def evict(self):
+        """
+        Removes the least recently used entries until the cache fits in its maximum size.
+        """
+        entries = []
+        total_size = 0
+        for entry in os.scandir(self.directory):
+            metadata_path = os.path.join(entry.path, 'metadata.json')
+            if entry.name.startswith('.') or not os.path.exists(metadata_path):
+                continue
+
+            size = sum(file.stat().st_size for file in os.scandir(entry.path))
+            entries.append((os.path.getmtime(metadata_path), size, entry.path))
+            total_size += size
+
+        for _, size, path in sorted(entries):
+            if total_size <= self.max_size:
+                break
+            shutil.rmtree(path, ignore_errors=True)
+            total_size -= size
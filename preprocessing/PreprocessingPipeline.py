@@ -6,24 +6,28 @@ from preprocessing.FeatureSelector import FeatureSelector
 from sklearn.model_selection import train_test_split
 import random
 
+import tracing
+
 
 class PreprocessingPipeline:
     """
     This is the pipeline that will be in charge of performing all the preprocessing steps.
     """
 
-    def __init__(self, dataframe, parameters):
+    def __init__(self, dataframe, parameters, cache=None):
         """
         Initialize a new instance of the Preprocessing pipepiline.
 
         Args:
             dataframe (dataframe): Data.
             parameters (dictionary): parameters dictionary that contain all the information related to the process.
+            cache (PreprocessingCache): on-disk cache of preprocessed datasets, None disables caching.
         """
         self.categorical_data = None
         self.numerical_data = None
         self.dataframe = dataframe
         self.parameters = parameters
+        self.cache = cache
 
     def split_by_data_type(self):
         """
@@ -42,6 +46,15 @@ class PreprocessingPipeline:
         Returns:
             The preprocessed dataframe.
         """
+        # Skip the whole preprocessing if this dataset was already preprocessed with the same parameters
+        if self.cache is not None:
+            cache_key = self.cache.generate_key(self.parameters)
+            with tracing.span('preprocessing/cache_load'):
+                cached_parameters = self.cache.load(cache_key)
+            if cached_parameters is not None:
+                self.parameters.update(cached_parameters)
+                return self.parameters
+
         # Keep wanted features only
         if 'features' in self.parameters and len(self.parameters['features']) >= 1:
             variables = self.parameters['features'] + [self.parameters['target']]
@@ -54,12 +67,14 @@ class PreprocessingPipeline:
         self.split_by_data_type()
 
         # Data cleaning
-        data_cleaner = DataCleaner(self.numerical_data, self.parameters)
-        self.numerical_data = data_cleaner.clean_data()
+        with tracing.span('preprocessing/cleaning'):
+            data_cleaner = DataCleaner(self.numerical_data, self.parameters)
+            self.numerical_data = data_cleaner.clean_data()
 
         # Data transforming
-        data_transformer = DataTransformer(self.numerical_data, self.categorical_data, self.parameters)
-        self.numerical_data, self.categorical_data = data_transformer.transform_data()
+        with tracing.span('preprocessing/transforming'):
+            data_transformer = DataTransformer(self.numerical_data, self.categorical_data, self.parameters)
+            self.numerical_data, self.categorical_data = data_transformer.transform_data()
 
         ### FEATURE EXTRACTION ###
 
@@ -80,10 +95,11 @@ class PreprocessingPipeline:
         # Feature selection
         if 'feature_selector' in self.parameters and self.parameters['feature_selector'] \
                 and 'num_features' in self.parameters and self.parameters['num_features'] > 0:
-            feature_selector = FeatureSelector(self.dataframe, self.parameters['target'],
-                                               self.parameters['feature_selector'],
-                                               self.parameters['num_features'])
-            self.dataframe = feature_selector.select_features()
+            with tracing.span('preprocessing/feature_selection'):
+                feature_selector = FeatureSelector(self.dataframe, self.parameters['target'],
+                                                   self.parameters['feature_selector'],
+                                                   self.parameters['num_features'])
+                self.dataframe = feature_selector.select_features()
         else:
             self.parameters['feature_selector'] = '-'
             self.parameters['num_features'] = '-'
@@ -107,8 +123,9 @@ class PreprocessingPipeline:
             y_test = 0
 
         if 'class_balancer' in self.parameters and self.parameters['class_balancer']:
-            class_balancer = ClassBalancer(X_train, y_train, self.parameters)
-            X_train, y_train = class_balancer.balance_classes()
+            with tracing.span('preprocessing/balancing'):
+                class_balancer = ClassBalancer(X_train, y_train, self.parameters)
+                X_train, y_train = class_balancer.balance_classes()
         else:
             self.parameters['class_balancer'] = '-'
 
@@ -118,6 +135,11 @@ class PreprocessingPipeline:
         self.parameters['y_train'] = y_train
         self.parameters['y_test'] = y_test
 
-        self.parameters['sample_size'] = X_train.shape[0] + X_test.shape[0]
+        # .632+ keeps every sample in the training set and has no test set
+        self.parameters['sample_size'] = X_train.shape[0] + (X_test.shape[0] if hasattr(X_test, 'shape') else 0)
+
+        if self.cache is not None:
+            with tracing.span('preprocessing/cache_store'):
+                self.cache.store(cache_key, self.parameters)
 
         return self.parameters
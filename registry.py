@@ -0,0 +1,52 @@
+import importlib
+
+# Location of the implementation behind every option that can be given in the parameters file. Classes are only
+# imported the first time they are requested, so a run only pays for the libraries its combination needs.
+registry = {
+    'model': {
+        'logistic_regression': 'model.models.LogisticRegression:LogisticRegression',
+        'random_forest': 'model.models.RandomForest:RandomForest',
+        'xgboost': 'model.models.XGBoost:XGBoost',
+        'rbf_svm': 'model.models.RBF_SVM:RBF_SVM',
+        'gradient_descent': 'model.models.GradientDescent:GradientDescent',
+    },
+    'estimator': {
+        'logistic_regression': 'sklearn.linear_model:LogisticRegression',
+        'random_forest': 'sklearn.ensemble:RandomForestClassifier',
+        'xgboost': 'xgboost:XGBClassifier',
+        'rbf_svm': 'sklearn.svm:SVC',
+        'gradient_descent': 'sklearn.linear_model:SGDClassifier',
+    },
+    'class_balancer': {
+        'smote': 'imblearn.over_sampling:SMOTE',
+        'random_oversampling': 'imblearn.over_sampling:RandomOverSampler',
+        'random_undersampling': 'imblearn.under_sampling:RandomUnderSampler',
+    },
+    'encoder': {
+        'target_encoding': 'category_encoders:TargetEncoder',
+    },
+    'evaluation_technique': {
+        'train_test': 'model.evaluation.TrainTest:TrainTest',
+        '.632+': 'model.evaluation.BootstrapPoint632:BootstrapPoint632',
+    },
+}
+
+
+def load(kind, name):
+    """
+    Imports and returns the class registered for an option.
+
+    Args:
+        kind (string): type of option, one of the keys of the registry ('model', 'estimator', 'class_balancer',
+        'encoder' or 'evaluation_technique').
+        name (string): value of the option, as given in the parameters file.
+
+    Returns:
+        The class implementing the option.
+    """
+    try:
+        module_name, class_name = registry[kind][name].split(':')
+    except KeyError:
+        raise ValueError("There is no {} registered with the name: {}".format(kind, name))
+
+    return getattr(importlib.import_module(module_name), class_name)
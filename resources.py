@@ -0,0 +1,106 @@
+import contextlib
+
+from joblib import cpu_count, parallel_config
+from threadpoolctl import threadpool_limits
+
+# CPUs given to the combination that runs in the current process, None keeps the libraries' own defaults
+_cpus = None
+
+
+def split_cpus(cpus, workers):
+    """
+    Divides the CPUs of the run between the worker processes that run the combinations.
+
+    Args:
+        cpus (int): CPUs of the whole run, all the available ones if None.
+        workers (int): requested number of worker processes.
+
+    Returns:
+        A tuple with the number of workers, never more than the given CPUs, and the CPUs of every combination.
+    """
+    workers = max(1, workers)
+    if cpus:
+        workers = min(workers, cpus)
+
+    return workers, max(1, (cpus or cpu_count()) // workers)
+
+
+def set_cpus(cpus):
+    """
+    Sets the CPUs of the combination that runs in the current process. The BLAS and OpenMP thread pools of the process
+    are limited to them.
+
+    Args:
+        cpus (int): CPUs of the combination, None removes the budget.
+    """
+    global _cpus
+    _cpus = cpus
+    if cpus is not None:
+        threadpool_limits(limits=cpus)
+
+
+def get_cpus():
+    """
+    Retrieves the CPUs of the combination that runs in the current process.
+
+    Returns:
+        The number of CPUs, or None if there is no budget.
+    """
+    return _cpus
+
+
+def allocate(requested_jobs, n_tasks=None):
+    """
+    Divides the CPUs of the combination between parallel jobs and the threads every job can use inside the estimator
+    and BLAS, so that jobs times threads never exceeds the budget.
+
+    Args:
+        requested_jobs (int): requested number of jobs, -1 or None for as many as CPUs.
+        n_tasks (int): number of tasks to be run, no more jobs than tasks are used.
+
+    Returns:
+        A tuple with the number of jobs and the threads of every job. Without a budget the requested jobs are returned
+        unchanged and the threads are None.
+    """
+    if _cpus is None:
+        return requested_jobs, None
+
+    jobs = _cpus if requested_jobs is None or requested_jobs < 1 else min(requested_jobs, _cpus)
+    if n_tasks:
+        jobs = min(jobs, n_tasks)
+    jobs = max(1, jobs)
+
+    return jobs, max(1, _cpus // jobs)
+
+
+def estimator_threads(estimator_params, threads):
+    """
+    Builds the parameters that set the threads of an estimator, for the estimators that have their own thread pool.
+
+    Args:
+        estimator_params (dict): parameters accepted by the estimator, as returned by get_params().
+        threads (int): threads of the estimator, None leaves its default.
+
+    Returns:
+        A dictionary with the 'n_jobs' parameter, empty if the estimator does not have it or there is no budget.
+    """
+    if threads is None or 'n_jobs' not in estimator_params:
+        return {}
+
+    return {'n_jobs': threads}
+
+
+@contextlib.contextmanager
+def limits(threads):
+    """
+    Limits the BLAS and OpenMP threads of a block of code, in the current process and in the joblib workers it starts.
+
+    Args:
+        threads (int): threads of every job, None leaves the limits unchanged.
+    """
+    if threads is None:
+        yield
+        return
+
+    with parallel_config(backend='loky', inner_max_num_threads=threads), threadpool_limits(limits=threads):
+        yield
@@ -0,0 +1,195 @@
+import contextlib
+import functools
+import glob
+import json
+import os
+import threading
+import time
+
+# Tracing is opt-in, spans cost a single check when it is disabled
+_enabled = False
+_output_path = None
+_events = []
+
+
+def enable(output_path=None):
+    """
+    Enables the recording of spans in the current process.
+
+    Args:
+        output_path (string): path to the output folder, where the joblib workers started from this process write
+            their spans.
+    """
+    global _enabled, _output_path
+    _enabled = True
+    _output_path = output_path
+
+
+def disable():
+    """
+    Disables the recording of spans in the current process.
+    """
+    global _enabled, _output_path
+    _enabled = False
+    _output_path = None
+
+
+def is_enabled():
+    """
+    Checks whether spans are being recorded in the current process.
+
+    Returns:
+        True if tracing is enabled.
+    """
+    return _enabled
+
+
+def task(function):
+    """
+    Wraps a function run by joblib so its spans are recorded in the worker process that runs it. Tracing is enabled in
+    the worker when it is enabled in the calling process, and the spans are written to the trace files once the
+    function finishes. Where the function runs in the calling process it is left as it is.
+
+    Args:
+        function (callable): function of the task, defined at module level so it can be sent to the workers.
+
+    Returns:
+        The wrapped function.
+    """
+    return functools.partial(_run_task, function, _enabled, _output_path)
+
+
+def _run_task(function, enabled, output_path, *args, **kwargs):
+    """
+    Runs a task wrapped by task(), recording its spans if tracing was enabled where it was created.
+    """
+    if not enabled or _enabled or output_path is None:
+        return function(*args, **kwargs)
+
+    # Workers are reused by later tasks, which may not be traced
+    enable(output_path)
+    try:
+        return function(*args, **kwargs)
+    finally:
+        flush(output_path)
+        disable()
+
+
+def current_rss():
+    """
+    Retrieves the resident set size of the current process.
+
+    Returns:
+        The resident memory in bytes, or the peak resident memory where the current one is not available.
+    """
+    try:
+        with open('/proc/self/statm', 'r') as file:
+            return int(file.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, IndexError):
+        import resource
+        return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+@contextlib.contextmanager
+def span(name, category='pipeline', **args):
+    """
+    Records the wall time, CPU time and resident memory difference of a block of code as a Chrome trace event.
+
+    Args:
+        name (string): name of the span, spans with the same name are aggregated in the summary.
+        category (string): category of the span.
+        args: extra information stored with the span.
+    """
+    if not _enabled:
+        yield
+        return
+
+    start_timestamp = time.time()
+    start_wall = time.perf_counter()
+    start_cpu = time.process_time()
+    start_rss = current_rss()
+    try:
+        yield
+    finally:
+        _events.append({
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': start_timestamp * 1e6,
+            'dur': (time.perf_counter() - start_wall) * 1e6,
+            'pid': os.getpid(),
+            'tid': threading.get_ident(),
+            'args': dict(args, cpu_time=time.process_time() - start_cpu,
+                         rss_delta_mb=(current_rss() - start_rss) / 1024 ** 2),
+        })
+
+
+def flush(output_path):
+    """
+    Appends the spans recorded so far to the trace file of the current process in the output folder. Every process
+    writes its own file so parallel workers never write to the same one.
+
+    Args:
+        output_path (string): path to the output folder.
+    """
+    global _events
+    if not _events:
+        return
+
+    with open(os.path.join(output_path, f"trace_{os.getpid()}.jsonl"), 'a') as file:
+        for event in _events:
+            file.write(json.dumps(event, default=str) + '\n')
+    _events = []
+
+
+def write_trace(output_path):
+    """
+    Merges the trace files of all the processes into trace.json, loadable in chrome://tracing or Perfetto, and writes
+    trace_summary.txt with the spans aggregated by name. The spans of previous runs in the output folder, such as
+    the ones of an interrupted run that is resumed, are kept, and the trace files of the processes are removed once
+    merged.
+
+    Args:
+        output_path (string): path to the output folder.
+    """
+    flush(output_path)
+
+    events = []
+    trace_path = os.path.join(output_path, 'trace.json')
+    if os.path.exists(trace_path):
+        try:
+            with open(trace_path, 'r') as file:
+                events = json.load(file)['traceEvents']
+        except (ValueError, KeyError):
+            events = []
+
+    process_paths = sorted(glob.glob(os.path.join(output_path, 'trace_*.jsonl')))
+    for path in process_paths:
+        with open(path, 'r') as file:
+            for line in file:
+                try:
+                    events.append(json.loads(line))
+                except ValueError:
+                    continue
+    if not events:
+        return
+
+    with open(trace_path, 'w') as file:
+        json.dump({'traceEvents': events, 'displayTimeUnit': 'ms'}, file)
+
+    for path in process_paths:
+        os.remove(path)
+
+    summary = {}
+    for event in events:
+        stats = summary.setdefault(event['name'], {'count': 0, 'wall': 0.0, 'cpu': 0.0, 'rss': 0.0})
+        stats['count'] += 1
+        stats['wall'] += event['dur'] / 1e6
+        stats['cpu'] += event['args']['cpu_time']
+        stats['rss'] = max(stats['rss'], event['args']['rss_delta_mb'])
+
+    with open(os.path.join(output_path, 'trace_summary.txt'), 'w') as file:
+        file.write(f"{'Span':<40}{'Count':>8}{'Wall (s)':>12}{'Mean (s)':>12}{'CPU (s)':>12}{'Max RSS delta (MB)':>20}\n")
+        for name, stats in sorted(summary.items(), key=lambda item: item[1]['wall'], reverse=True):
+            file.write(f"{name:<40}{stats['count']:>8}{stats['wall']:>12.3f}{stats['wall'] / stats['count']:>12.4f}"
+                       f"{stats['cpu']:>12.3f}{stats['rss']:>20.1f}\n")